@@ -0,0 +1,69 @@
+from __future__ import annotations
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+API_BASE = os.getenv("INCIDENTMIND_API_URL", "http://127.0.0.1:8000")
+
+LIST_TTL_SECONDS = 10
+INCIDENT_TTL_SECONDS = 3600
+# Bodies kept for 304 revalidation, shared by every session; LRU beyond this
+ETAG_CACHE_ENTRIES = 64
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """One keep-alive connection pool shared across reruns and browser sessions."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_resource
+def _etag_cache() -> Tuple["OrderedDict[Tuple[str, Tuple], Tuple[str, Any]]", threading.Lock]:
+    # (path, params) -> (etag, decoded body); survives st.cache_data TTL expiry
+    return OrderedDict(), threading.Lock()
+
+
+def _conditional_get(path: str, params: Optional[Dict[str, Any]] = None, timeout: float = 10) -> Any:
+    """GET with If-None-Match; a 304 reuses the last body without re-downloading it."""
+    key = (path, tuple(sorted((params or {}).items())))
+    cache, lock = _etag_cache()
+    with lock:
+        cached = cache.get(key)
+        if cached is not None:
+            cache.move_to_end(key)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+
+    r = get_session().get(f"{API_BASE}{path}", params=params, headers=headers, timeout=timeout)
+    if r.status_code == 304 and cached:
+        return cached[1]
+    r.raise_for_status()
+
+    body = r.json()
+    etag = r.headers.get("ETag")
+    if etag:
+        with lock:
+            cache[key] = (etag, body)
+            cache.move_to_end(key)
+            while len(cache) > ETAG_CACHE_ENTRIES:
+                cache.popitem(last=False)
+    return body
+
+
+@st.cache_data(ttl=LIST_TTL_SECONDS, show_spinner=False)
+def list_incidents(limit: int) -> List[Dict[str, Any]]:
+    return _conditional_get("/incidents", {"limit": limit}, timeout=5).get("incidents", [])
+
+
+@st.cache_data(ttl=INCIDENT_TTL_SECONDS, max_entries=256, show_spinner=False)
+def get_incident(incident_id: str) -> Dict[str, Any]:
+    # Stored reports are immutable, so a long TTL is safe.
+    return _conditional_get(f"/incidents/{incident_id}")
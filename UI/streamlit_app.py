@@ -1,9 +1,7 @@
 import json
-import requests
 import streamlit as st
-import os
 
-API_BASE = os.getenv("INCIDENTMIND_API_URL", "http://127.0.0.1:8000")
+from api_client import API_BASE, get_incident, get_session, list_incidents
 
 
 st.set_page_config(page_title="IncidentMind", layout="wide")
@@ -17,8 +15,7 @@ with st.sidebar:
 
     incidents = []
     try:
-        r = requests.get(f"{API_BASE}/incidents", params={"limit": limit}, timeout=5)
-        incidents = r.json().get("incidents", [])
+        incidents = list_incidents(limit)
     except Exception:
         st.warning("Could not load incident list. Is FastAPI running?")
 
@@ -29,9 +26,9 @@ with st.sidebar:
 
     if selected_id:
         try:
-            r = requests.get(f"{API_BASE}/incidents/{selected_id}", timeout=10)
+            data = get_incident(selected_id)
             st.success("Loaded incident")
-            st.json(r.json())
+            st.json(data)
         except Exception as e:
             st.error(f"Failed to load incident: {e}")
 
@@ -69,34 +66,53 @@ if st.button("Run /incidents/triage"):
         "options": {"time_window_minutes": int(time_window)},
     }
 
+    # Stream sections as each agent finishes; the read timeout applies per line,
+    # so long time windows no longer hit a single whole-request timeout.
+    status = st.empty()
+    status.info("Running triage…")
+    slots = {"incident_context": st.container()}
+    c1, c2 = st.columns(2)
+    slots["log_findings"] = c1.container()
+    slots["metric_findings"] = c2.container()
+    for section in ("rca_hypothesis", "remediation_plan", "safety"):
+        slots[section] = st.container()
+    titles = {
+        "incident_context": "Incident Context",
+        "log_findings": "Log Findings",
+        "metric_findings": "Metric Findings",
+        "rca_hypothesis": "RCA Hypothesis",
+        "remediation_plan": "Remediation Plan",
+        "safety": "Safety",
+    }
+    placeholders = {}
+    for section, slot in slots.items():
+        slot.subheader(titles[section])
+        placeholders[section] = slot.empty()
+
     try:
-        r = requests.post(f"{API_BASE}/incidents/triage", json=payload, timeout=30)
-        if r.status_code != 200:
-            st.error(f"API error {r.status_code}: {r.text}")
-        else:
-            data = r.json()
-            st.success(f"Stored incident: {data.get('incident_id')} at {data.get('created_at')}")
-
-            report = data.get("report", {})
-            st.subheader("Incident Context")
-            st.json(report.get("incident_context", {}))
-
-            c1, c2 = st.columns(2)
-            with c1:
-                st.subheader("Log Findings")
-                st.json(report.get("log_findings", {}))
-            with c2:
-                st.subheader("Metric Findings")
-                st.json(report.get("metric_findings", {}))
-
-            st.subheader("RCA Hypothesis")
-            st.json(report.get("rca_hypothesis", {}))
-
-            st.subheader("Remediation Plan")
-            st.json(report.get("remediation_plan", {}))
-
-            st.subheader("Safety")
-            st.json(report.get("safety", {}))
+        with get_session().post(
+            f"{API_BASE}/incidents/triage/stream", json=payload, stream=True, timeout=(5, 30)
+        ) as r:
+            if r.status_code != 200:
+                status.error(f"API error {r.status_code}: {r.text}")
+            else:
+                for line in r.iter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    section, data = event.get("section"), event.get("data", {})
+                    if section in ("queued", "keepalive"):
+                        # Sent while the job waits for a worker; keeps the read timeout from firing
+                        if data.get("status") == "queued":
+                            status.info("Queued for triage…")
+                    elif section == "done":
+                        list_incidents.clear()  # new report: refresh history on next rerun
+                        status.success(f"Stored incident: {data.get('incident_id')} at {data.get('created_at')}")
+                    elif section == "error":
+                        status.error(f"Triage {data.get('status')}: {data.get('error')}")
+                    elif section in placeholders:
+                        status.info("Running triage…")
+                        placeholders[section].json(data)
 
     except Exception as e:
-        st.error(f"Failed to call API: {e}")
+        status.error(f"Failed to call API: {e}")
@@ -13,10 +13,11 @@ def analyze_logs(log_lines: List[str], top_n: int = 5) -> Dict[str, Any]:
     and correlated request IDs from raw log lines.
     """
     if not log_lines:
-        return {"top_errors": [], "notable_trace": None, "correlated_ids": []}
+        return {"top_errors": [], "notable_trace": None, "correlated_ids": [], "error_request_ids": []}
 
     errors: List[str] = []
     request_ids: List[str] = []
+    error_request_ids: List[str] = []
     notable_trace: Optional[str] = None
 
     for line in log_lines:
@@ -30,6 +31,8 @@ def analyze_logs(log_lines: List[str], top_n: int = 5) -> Dict[str, Any]:
                 errors.append(msg_match.group(1))
             else:
                 errors.append(line)
+            if rid:
+                error_request_ids.append(rid.group(1))
 
             if notable_trace is None:
                 notable_trace = line
@@ -53,4 +56,6 @@ def analyze_logs(log_lines: List[str], top_n: int = 5) -> Dict[str, Any]:
         "top_errors": top_errors,
         "notable_trace": notable_trace,
         "correlated_ids": correlated,
+        # Most recent failing requests, for cross-service correlation
+        "error_request_ids": list(dict.fromkeys(reversed(error_request_ids)))[:50],
     }
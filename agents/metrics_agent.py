@@ -1,7 +1,9 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Mapping, Optional, Sequence
 import statistics
 
+from tools.metrics_columnar import epoch_to_iso
+
 DEFAULT_THRESHOLDS = {
     "error_rate": 0.10,
     "latency_p95_ms": 800,
@@ -35,6 +37,35 @@ def analyze_metrics(
             if isinstance(v, (int, float)):
                 series[k].append(float(v))
 
+    return _analyze_series(series, ts_list[-1] if ts_list else None, thresholds)
+
+
+def analyze_metric_columns(
+    columns: Mapping[str, Sequence[float]],
+    thresholds: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """
+    Metrics Analysis Agent (V1): same checks as analyze_metrics, but over
+    column arrays from tools.metrics_columnar.read_window (NaN = missing).
+    """
+    ts = columns.get("ts")
+    if ts is None or len(ts) == 0:
+        return {"anomalies": [], "correlations": []}
+
+    thresholds = thresholds or DEFAULT_THRESHOLDS
+    series: Dict[str, List[float]] = {}
+    for k in thresholds.keys():
+        col = columns.get(k)
+        series[k] = [v for v in col if v == v] if col is not None else []
+
+    return _analyze_series(series, epoch_to_iso(ts[-1]), thresholds)
+
+
+def _analyze_series(
+    series: Dict[str, List[float]],
+    last_ts: Optional[str],
+    thresholds: Dict[str, float],
+) -> Dict[str, Any]:
     anomalies = []
     for k, vals in series.items():
         if not vals:
@@ -46,7 +77,7 @@ def analyze_metrics(
                 "metric": k,
                 "last_value": round(last, 4),
                 "threshold": thr,
-                "timestamp": ts_list[-1] if ts_list else None,
+                "timestamp": last_ts,
             })
 
     # Simple “correlations” (heuristic, not statistical)
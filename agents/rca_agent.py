@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 
 def _has_error(log_findings: Dict[str, Any], keyword: str) -> bool:
@@ -13,10 +13,13 @@ def build_rca_hypothesis(
     incident_context: Dict[str, Any],
     log_findings: Dict[str, Any],
     metric_findings: Dict[str, Any],
+    similar_incidents: Optional[List[Dict[str, Any]]] = None,
 ) -> Dict[str, Any]:
     """
     RCA Agent (V1): rule-based synthesis of logs + metrics into a hypothesis.
     Later we will upgrade this to LLM-based reasoning with tool safety.
+    similar_incidents (from tools.similarity) that share the chosen root
+    cause add a small confidence boost.
     """
     evidence: List[str] = []
     alternatives: List[str] = []
@@ -68,6 +71,26 @@ def build_rca_hypothesis(
         evidence.append("No strong log or metric signature detected")
         alternatives.extend(["Database issue", "Dependency issue", "Deployment regression"])
 
+    # Correlated requests that also failed in other services
+    failing_elsewhere = sorted(
+        svc
+        for svc, levels in ((log_findings.get("cross_service") or {}).get("services") or {}).items()
+        if levels.get("ERROR")
+    )
+    if failing_elsewhere:
+        evidence.append(f"Correlated requests also logged errors in: {', '.join(failing_elsewhere)}")
+        alternatives.append(f"Upstream/downstream failure in {', '.join(failing_elsewhere)}")
+
+    # Past incidents with matching signatures and the same conclusion
+    similar_ids: List[str] = []
+    if root_cause != "Insufficient evidence (V1)":
+        for sim in similar_incidents or []:
+            if sim.get("root_cause") == root_cause:
+                similar_ids.append(sim.get("incident_id"))
+        if similar_ids:
+            confidence += 0.05
+            evidence.append(f"Similar past incidents had the same root cause: {', '.join(similar_ids[:3])}")
+
     # clamp confidence to [0,1]
     confidence = max(0.0, min(1.0, confidence))
 
@@ -76,4 +99,5 @@ def build_rca_hypothesis(
         "confidence": round(confidence, 2),
         "evidence": evidence,
         "alternatives": alternatives,
+        "similar_incidents": similar_ids,
     }
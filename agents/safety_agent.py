@@ -15,6 +15,19 @@ UNSAFE_KEYWORDS = [
 ]
 
 
+def _scannable(report: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Drop quoted evidence that is raw log text from other services
+    (log_findings.cross_service.lines): it is data, not generated advice, and
+    a harmless line like 'DELETE /cart/42 204' must not block the report.
+    """
+    logs = report.get("log_findings")
+    if not isinstance(logs, dict) or not isinstance(logs.get("cross_service"), dict):
+        return report
+    cross = {k: v for k, v in logs["cross_service"].items() if k != "lines"}
+    return {**report, "log_findings": {**logs, "cross_service": cross}}
+
+
 def safety_check(report: Dict[str, Any]) -> Dict[str, Any]:
     """
     Safety Agent (V1): simple output guardrail.
@@ -25,7 +38,7 @@ def safety_check(report: Dict[str, Any]) -> Dict[str, Any]:
     blocked = False
 
     # Convert report to a string for a lightweight scan
-    blob = str(report).lower()
+    blob = str(_scannable(report)).lower()
 
     for kw in UNSAFE_KEYWORDS:
         if kw in blob:
@@ -0,0 +1,260 @@
+from __future__ import annotations
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from tools.observability import log_event
+
+SEVERITY_RANK = {"critical": 0, "high": 1, "medium": 2, "warning": 2, "low": 3, "info": 4}
+DEFAULT_RANK = 2
+
+
+def severity_rank(severity: str) -> int:
+    return SEVERITY_RANK.get((severity or "").lower(), DEFAULT_RANK)
+
+
+class Rejected(Exception):
+    """Raised by submit() when a job is shed; carries the HTTP status to return."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+@dataclass
+class Job:
+    incident_id: str
+    service: str
+    severity: str
+    payload: Any
+    enqueued_at: float = field(default_factory=time.monotonic)
+    status: str = "queued"  # queued | running | done | failed | shed
+    result: Any = None
+    error: Optional[str] = None
+    finished_at: Optional[float] = None
+    done: threading.Event = field(default_factory=threading.Event)
+    # Called from the worker thread with (section, output) as the pipeline progresses
+    on_section: Optional[Callable[[str, Any], None]] = None
+    callbacks: List[Callable[[], None]] = field(default_factory=list, repr=False)
+
+    @property
+    def priority(self) -> Tuple[int, float]:
+        return severity_rank(self.severity), self.enqueued_at
+
+    def describe(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"incident_id": self.incident_id, "status": self.status, "service": self.service, "severity": self.severity}
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+@dataclass
+class AdmissionConfig:
+    workers: int = int(os.getenv("INCIDENTMIND_TRIAGE_WORKERS", "4"))
+    max_queue: int = int(os.getenv("INCIDENTMIND_TRIAGE_MAX_QUEUE", "200"))
+    per_service_running: int = int(os.getenv("INCIDENTMIND_TRIAGE_PER_SERVICE", "2"))
+    per_service_queued: int = int(os.getenv("INCIDENTMIND_TRIAGE_PER_SERVICE_QUEUED", "50"))
+    # Finished jobs are kept this long for polling; after that the stored report is the source of truth
+    keep_finished_s: float = 600.0
+    keep_finished_max: int = 10_000
+
+
+class TriageQueue:
+    """
+    Bounded work queue for triage jobs, ordered by (severity rank, age).
+
+    - A worker takes the best queued job whose service is under its
+      running limit, so one noisy service cannot occupy every worker.
+    - When the queue is full, a new job evicts the lowest-priority queued
+      job if it outranks it; otherwise the new job is rejected with 503.
+    - The same rule applies per service: at its queued limit, a new job
+      evicts that service's lowest-priority queued job, or gets 429.
+    """
+
+    def __init__(self, run: Callable[[Job], Any], config: Optional[AdmissionConfig] = None) -> None:
+        self.run = run
+        self.config = config or AdmissionConfig()
+        self._heap: List[Tuple[int, float, int, Job]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running: Dict[str, int] = defaultdict(int)
+        self._queued: Dict[str, int] = defaultdict(int)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._threads: List[threading.Thread] = []
+        self._avg_run_s = 1.0
+        self._shed = 0
+        self._completed = 0
+
+    # ---------- lifecycle
+    def start(self) -> None:
+        with self._cond:
+            if self._threads:
+                return
+            for i in range(self.config.workers):
+                t = threading.Thread(target=self._worker, name=f"incidentmind-triage-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    # ---------- submission
+    def retry_after(self) -> int:
+        backlog = len(self._heap) / max(1, self.config.workers)
+        return max(1, int(backlog * self._avg_run_s + 0.5))
+
+    def submit(self, job: Job) -> Job:
+        self.start()
+        cfg = self.config
+        with self._cond:
+            if self._queued[job.service] >= cfg.per_service_queued:
+                same = [item for item in self._heap if item[3].service == job.service]
+                if not self._evict_worst(same, job):
+                    self._shed += 1
+                    raise Rejected(429, f"Too many queued triages for {job.service}", self.retry_after())
+
+            if len(self._heap) >= cfg.max_queue and not self._evict_worst(self._heap, job):
+                self._shed += 1
+                raise Rejected(503, "Triage queue is full", self.retry_after())
+
+            rank, age = job.priority
+            heapq.heappush(self._heap, (rank, age, next(self._seq), job))
+            self._queued[job.service] += 1
+            self._jobs[job.incident_id] = job
+            self._prune()
+            self._cond.notify()
+        return job
+
+    def _evict_worst(self, items: List[Tuple[int, float, int, Job]], job: Job) -> bool:
+        """Shed the lowest-priority queued job in `items` if `job` outranks it (caller holds the lock)."""
+        if not items:
+            return False
+        worst = max(items, key=lambda item: (item[0], item[1]))
+        if (worst[0], worst[1]) <= job.priority:
+            return False
+        self._heap.remove(worst)
+        heapq.heapify(self._heap)
+        self._queued[worst[3].service] -= 1
+        self._shed += 1
+        self._finish(worst[3], "shed", error="Shed for higher-severity work")
+        return True
+
+    def get(self, incident_id: str) -> Optional[Job]:
+        with self._cond:
+            return self._jobs.get(incident_id)
+
+    def add_done_callback(self, job: Job, fn: Callable[[], None]) -> None:
+        """Run fn() once the job finishes (on the finishing thread), or now if it already has."""
+        with self._cond:
+            if job.finished_at is None:
+                job.callbacks.append(fn)
+                return
+        fn()
+
+    async def wait(self, job: Job, timeout: Optional[float] = None) -> bool:
+        """Await job completion from the event loop without parking a threadpool thread."""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+
+        def wake() -> None:
+            if not fut.done():
+                fut.set_result(None)
+
+        def notify() -> None:
+            try:
+                loop.call_soon_threadsafe(wake)
+            except RuntimeError:
+                pass  # loop already closed
+
+        self.add_done_callback(job, notify)
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            with self._cond:
+                if notify in job.callbacks:
+                    job.callbacks.remove(notify)
+        return job.finished_at is not None
+
+    # ---------- workers
+    def _take(self) -> Optional[Job]:
+        skipped = []
+        job = None
+        while self._heap:
+            item = heapq.heappop(self._heap)
+            if self._running[item[3].service] < self.config.per_service_running:
+                job = item[3]
+                break
+            skipped.append(item)
+        for item in skipped:
+            heapq.heappush(self._heap, item)
+        return job
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                job = self._take()
+                while job is None:
+                    self._cond.wait()
+                    job = self._take()
+                self._queued[job.service] -= 1
+                self._running[job.service] += 1
+                job.status = "running"
+
+            started = time.monotonic()
+            try:
+                result = self.run(job)
+                status, error = "done", None
+            except Exception as e:
+                result, status, error = None, "failed", repr(e)
+                log_event("triage_job_failed", job.incident_id, {"service": job.service, "error": error})
+            elapsed = time.monotonic() - started
+
+            with self._cond:
+                self._running[job.service] -= 1
+                self._avg_run_s = 0.9 * self._avg_run_s + 0.1 * elapsed
+                self._completed += 1
+                job.result = result
+                self._finish(job, status, error)
+                # A per-service slot freed up: a skipped job may now be runnable
+                self._cond.notify_all()
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None) -> None:
+        job.status = status
+        job.error = error
+        job.finished_at = time.monotonic()
+        job.done.set()
+        callbacks, job.callbacks = job.callbacks, []
+        for fn in callbacks:
+            fn()
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self.config.keep_finished_s
+        for incident_id, job in list(self._jobs.items()):
+            if len(self._jobs) <= self.config.keep_finished_max and (job.finished_at is None or job.finished_at > cutoff):
+                break
+            if job.finished_at is not None:
+                del self._jobs[incident_id]
+
+    # ---------- introspection
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            by_severity: Dict[str, int] = defaultdict(int)
+            for _, _, _, job in self._heap:
+                by_severity[job.severity] += 1
+            oldest = min((job.enqueued_at for _, _, _, job in self._heap), default=None)
+            return {
+                "queue_depth": len(self._heap),
+                "queue_depth_by_severity": dict(by_severity),
+                "running": sum(self._running.values()),
+                "workers": self.config.workers,
+                "max_queue": self.config.max_queue,
+                "oldest_queued_s": round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+                "avg_run_s": round(self._avg_run_s, 3),
+                "completed": self._completed,
+                "shed": self._shed,
+            }
@@ -1,26 +1,43 @@
 from __future__ import annotations
 
-import json
-from pathlib import Path
-from typing import Optional, Dict, Any
-
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hashlib
+import os
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, AsyncIterator, Iterator, Tuple
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
+import orjson
 
 from agents.alert_agent import build_incident_context
 from agents.log_agent import analyze_logs
-from agents.metrics_agent import analyze_metrics
+from agents.metrics_agent import analyze_metrics, analyze_metric_columns
 from agents.rca_agent import build_rca_hypothesis
 from agents.remediation_agent import build_remediation_plan
 from agents.safety_agent import safety_check
 
-from tools.logs import fetch_logs
-from tools.metrics import fetch_metrics
-from tools.storage import new_incident_id, save_report, load_report
+from tools.datasources import FileDataSource, SourceUnavailable, data_source
+from tools.log_index import REQUEST_ID_INDEX
+from tools.metrics_columnar import columnar_is_current, read_window
+from tools.report_cache import CachedReport, gzip_etag
+from tools.similarity import minhash, report_features
+from tools.storage import REPORT_DIR, new_incident_id, save_report, load_report, load_report_entry, report_created_at, report_etag, similarity_index
 from tools.observability import new_trace_id, log_event
 
+from app.admission import Job, Rejected, TriageQueue
+from app.watch import WatchScheduler
+
 app = FastAPI(title="IncidentMind API", version="0.1.0")
 
+WATCH_ENABLED = os.getenv("INCIDENTMIND_WATCH", "0") == "1"
+
+# Max silence on /incidents/triage/stream before a keepalive line is sent
+STREAM_KEEPALIVE_S = float(os.getenv("INCIDENTMIND_STREAM_KEEPALIVE_S", "10"))
+REPORT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
 
 # ---------- Schemas (V1) ----------
 class AlertPayload(BaseModel):
@@ -47,13 +64,27 @@ def health():
     return {"status": "ok"}
 
 
-@app.post("/incidents/triage")
-def triage_incident(req: TriageRequest):
+@app.get("/watch/status")
+def watch_status():
+    return {"enabled": WATCH_ENABLED, **watch_scheduler.status()}
+
+
+def _validate_alert(req: TriageRequest) -> None:
     # Basic validation
     if not req.alert.service or not req.alert.severity or not req.alert.timestamp:
         raise HTTPException(status_code=400, detail="Invalid alert payload")
 
-    incident_id = new_incident_id()
+
+def _triage_steps(req: TriageRequest, incident_id: Optional[str] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Run the agent chain, yielding (section, output) as each stage completes.
+    The last item is ("done", CachedReport) holding the stored envelope bytes.
+
+    Findings are streamed early only if the Safety Agent passes them on
+    their own; RCA and remediation wait for the full-report check. If the
+    report ends up blocked, every section is re-sent in its blocked form.
+    """
+    incident_id = incident_id or new_incident_id()
     trace_id = new_trace_id()
 
     log_event(
@@ -77,19 +108,49 @@ def triage_incident(req: TriageRequest):
             "symptoms": mock_incident_context.get("symptoms"),
         },
     )
+    yield "incident_context", mock_incident_context
 
     # ---- Log Agent
-    log_lines = fetch_logs(req.alert.service)
+    source = data_source()
+    try:
+        log_lines = source.fetch_logs(req.alert.service)
+    except SourceUnavailable as e:
+        log_event("log_source_unavailable", trace_id, {"error": str(e)})
+        log_lines = []
     mock_log_findings = analyze_logs(log_lines)
+    try:
+        mock_log_findings["cross_service"] = source.correlate_requests(
+            mock_log_findings.get("error_request_ids") or mock_log_findings.get("correlated_ids", []),
+            req.alert.service,
+        )
+    except SourceUnavailable as e:
+        log_event("correlation_source_unavailable", trace_id, {"error": str(e)})
+        mock_log_findings["cross_service"] = {"services": {}, "lines": []}
     log_event(
         "log_agent_done",
         trace_id,
-        {"top_errors": mock_log_findings.get("top_errors", [])[:3]},
+        {
+            "top_errors": mock_log_findings.get("top_errors", [])[:3],
+            "cross_service": mock_log_findings["cross_service"]["services"],
+        },
     )
+    streamed = set()
+    if not safety_check({"log_findings": mock_log_findings}).get("blocked"):
+        streamed.add("log_findings")
+        yield "log_findings", mock_log_findings
 
     # ---- Metrics Agent
-    metric_events = fetch_metrics(req.alert.service, limit=120)
-    mock_metric_findings = analyze_metrics(metric_events)
+    # Prefer the local columnar store (mmap'd slices, no JSON parsing) when it is
+    # at least as fresh as the JSONL file
+    if isinstance(source, FileDataSource) and columnar_is_current(req.alert.service):
+        mock_metric_findings = analyze_metric_columns(read_window(req.alert.service, limit=120))
+    else:
+        try:
+            metric_events = source.fetch_metrics(req.alert.service, limit=120)
+        except SourceUnavailable as e:
+            log_event("metrics_source_unavailable", trace_id, {"error": str(e)})
+            metric_events = []
+        mock_metric_findings = analyze_metrics(metric_events)
     log_event(
         "metrics_agent_done",
         trace_id,
@@ -98,12 +159,24 @@ def triage_incident(req: TriageRequest):
             "correlations": mock_metric_findings.get("correlations", []),
         },
     )
+    if not safety_check({"metric_findings": mock_metric_findings}).get("blocked"):
+        streamed.add("metric_findings")
+        yield "metric_findings", mock_metric_findings
 
     # ---- RCA Agent
+    probe = {
+        "incident_context": mock_incident_context,
+        "log_findings": mock_log_findings,
+        "metric_findings": mock_metric_findings,
+    }
+    similar = similarity_index().query(
+        minhash(report_features(probe, include_root_cause=False)), k=3, min_score=0.5
+    )
     mock_rca_hypothesis = build_rca_hypothesis(
         mock_incident_context,
         mock_log_findings,
         mock_metric_findings,
+        similar_incidents=similar,
     )
     log_event(
         "rca_agent_done",
@@ -161,41 +234,300 @@ def triage_incident(req: TriageRequest):
             },
             "safety": safety,
         }
-        stored = save_report(incident_id, blocked_report)
-        return stored
+        for section in ("log_findings", "metric_findings", "rca_hypothesis", "remediation_plan", "safety"):
+            yield section, blocked_report[section]
+        yield "done", save_report(incident_id, blocked_report)
+        return
 
     # Normal response: attach safety, store, return storage envelope
+    for section in ("log_findings", "metric_findings", "rca_hypothesis", "remediation_plan"):
+        if section not in streamed:
+            yield section, report[section]
+    yield "safety", safety
     final_payload = {**report, "safety": safety}
-    stored = save_report(incident_id, final_payload)
+    yield "done", save_report(incident_id, final_payload)
+
+
+def _run_triage_job(job: Job) -> CachedReport:
+    stored: Optional[CachedReport] = None
+    for section, output in _triage_steps(job.payload, job.incident_id):
+        if job.on_section is not None:
+            job.on_section(section, output)
+        if section == "done":
+            stored = output
     return stored
 
 
+triage_queue = TriageQueue(_run_triage_job)
+
+
+def _new_job(req: TriageRequest) -> Job:
+    return Job(
+        incident_id=new_incident_id(),
+        service=req.alert.service,
+        severity=req.alert.severity,
+        payload=req,
+    )
+
+
+def _submit_triage(job: Job) -> Job:
+    try:
+        return triage_queue.submit(job)
+    except Rejected as e:
+        log_event("triage_request_shed", job.incident_id, {"service": job.service, "severity": job.severity, "status": e.status_code})
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+
+def _job_response(job: Job) -> Response:
+    if job.status == "done":
+        # Send the bytes save_report already produced instead of re-encoding the dict
+        return Response(job.result.body, media_type="application/json", headers={"ETag": job.result.etag})
+    if job.status == "shed":
+        raise HTTPException(status_code=503, detail=job.error, headers={"Retry-After": str(triage_queue.retry_after())})
+    raise HTTPException(status_code=500, detail=job.error or "Triage failed")
+
+
+@app.post("/incidents/triage")
+async def triage_incident(req: TriageRequest, async_mode: bool = Query(False, alias="async")):
+    """
+    Runs through the admission queue (severity-ordered, per-service limits,
+    load shedding). With ?async=true, returns 202 + incident_id immediately;
+    poll GET /incidents/{incident_id}/status for the result.
+    """
+    _validate_alert(req)
+    job = _submit_triage(_new_job(req))
+    if async_mode:
+        return Response(
+            orjson.dumps({**job.describe(), "status_url": f"/incidents/{job.incident_id}/status"}),
+            status_code=202,
+            media_type="application/json",
+        )
+    await triage_queue.wait(job)
+    return _job_response(job)
+
+
+@app.get("/incidents/{incident_id}/status")
+async def triage_status(incident_id: str, wait: float = Query(0, ge=0, le=30)):
+    """Poll an async triage; wait > 0 long-polls up to that many seconds."""
+    job = triage_queue.get(incident_id)
+    if job is None:
+        if await run_in_threadpool(report_etag, incident_id) is None:
+            raise HTTPException(status_code=404, detail="Incident not found")
+        return {"incident_id": incident_id, "status": "done", "report_url": f"/incidents/{incident_id}"}
+
+    if wait and not job.done.is_set():
+        await triage_queue.wait(job, wait)
+    out = job.describe()
+    if job.status == "done":
+        out["report_url"] = f"/incidents/{incident_id}"
+    return out
+
+
+@app.get("/datasource/status")
+def datasource_status():
+    return data_source().stats()
+
+
+@app.get("/admission/status")
+def admission_status():
+    return triage_queue.status()
+
+
+@app.post("/incidents/triage/stream")
+async def triage_incident_stream(req: TriageRequest):
+    """
+    Same pipeline as /incidents/triage, streamed as NDJSON: one
+    {"section": ..., "data": ...} line per agent output, then a final
+    {"section": "done", "data": <stored envelope>} line.
+    Runs through the admission queue like any other triage: the first line
+    is {"section": "queued"}, and a {"section": "keepalive"} line follows
+    every STREAM_KEEPALIVE_S without output so client read timeouts do not
+    fire while the job waits. A job that is shed or fails after streaming
+    started ends with an "error" line.
+    """
+    _validate_alert(req)
+    loop = asyncio.get_running_loop()
+    sections: asyncio.Queue = asyncio.Queue()
+
+    def publish(section: Optional[str], output: Any = None) -> None:
+        loop.call_soon_threadsafe(sections.put_nowait, (section, output))
+
+    job = _new_job(req)
+    job.on_section = publish
+    _submit_triage(job)
+    # Sections and this sentinel are posted from the same worker thread, so it arrives last
+    triage_queue.add_done_callback(job, lambda: publish(None))
+
+    async def ndjson() -> AsyncIterator[bytes]:
+        yield orjson.dumps({"section": "queued", "data": job.describe()}) + b"\n"
+        while True:
+            try:
+                section, output = await asyncio.wait_for(sections.get(), STREAM_KEEPALIVE_S)
+            except asyncio.TimeoutError:
+                yield orjson.dumps({"section": "keepalive", "data": job.describe()}) + b"\n"
+                continue
+            if section is None:
+                if job.status != "done":
+                    yield orjson.dumps({"section": "error", "data": job.describe()}) + b"\n"
+                return
+            if section == "done":
+                yield b'{"section":"done","data":' + output.body + b"}\n"
+            else:
+                yield orjson.dumps({"section": section, "data": output}) + b"\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+def _matched_etag(request: Request, *etags: str) -> Optional[str]:
+    """The first of `etags` that If-None-Match lists (weakly compared), if any."""
+    inm = request.headers.get("if-none-match")
+    if not inm:
+        return None
+    tags = {t.strip() for t in inm.split(",")}
+    for etag in etags:
+        if "*" in tags or etag in tags or f"W/{etag}" in tags:
+            return etag
+    return None
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    return _matched_etag(request, etag) is not None
+
+
+def _accepts_gzip(request: Request) -> bool:
+    """Honour q-values: "gzip;q=0" refuses gzip, "*" covers it unless gzip is listed."""
+    star = None
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding == "gzip":
+            return q > 0
+        if coding == "*":
+            star = q > 0
+    return bool(star)
+
+
 @app.get("/incidents/{incident_id}")
-def get_incident(incident_id: str):
-    data = load_report(incident_id)
-    if not data:
+def get_incident(incident_id: str, request: Request):
+    etag = report_etag(incident_id)
+    if etag is None:
         raise HTTPException(status_code=404, detail="Incident not found")
-    return data
+
+    # Reports never change once written, so clients may cache them forever.
+    # The gzip and identity encodings are different representations, so
+    # each has its own strong ETag; a 304 for either needs only the stat().
+    headers = {"Cache-Control": REPORT_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    matched = _matched_etag(request, etag, gzip_etag(etag))
+    if matched is not None:
+        return Response(status_code=304, headers={**headers, "ETag": matched})
+
+    entry = load_report_entry(incident_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    if entry.gzipped is not None and _accepts_gzip(request):
+        return Response(
+            entry.gzipped,
+            media_type="application/json",
+            headers={**headers, "ETag": gzip_etag(entry.etag), "Content-Encoding": "gzip"},
+        )
+    return Response(entry.body, media_type="application/json", headers={**headers, "ETag": entry.etag})
+
+
+@app.get("/incidents/{incident_id}/similar")
+def similar_incidents(incident_id: str, k: int = Query(5, ge=1, le=50)):
+    index = similarity_index()
+    sig = index.signature(incident_id)
+    if sig is None:
+        data = load_report(incident_id)
+        if not data:
+            raise HTTPException(status_code=404, detail="Incident not found")
+        sig = minhash(report_features(data.get("report") or {}))
+    return {"incident_id": incident_id, "similar": index.query(sig, k=k, exclude=incident_id)}
 
 
 @app.get("/incidents")
-def list_incidents(limit: int = 20):
-    report_dir = Path(__file__).resolve().parents[1] / "outputs" / "incident_reports"
-    if not report_dir.exists():
-        return {"incidents": []}
+def list_incidents(request: Request, limit: int = 20):
+    if not REPORT_DIR.exists():
+        return Response(b'{"incidents":[]}', media_type="application/json")
 
-    files = sorted(report_dir.glob("inc_*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
-    items = []
-    for p in files[:limit]:
+    stats = []
+    for p in REPORT_DIR.glob("inc_*.json"):
         try:
-            payload = json.loads(p.read_text(encoding="utf-8"))
-            items.append(
-                {
-                    "incident_id": payload.get("incident_id"),
-                    "created_at": payload.get("created_at"),
-                }
-            )
-        except Exception:
+            stats.append((p, p.stat()))
+        except FileNotFoundError:
+            continue
+    stats.sort(key=lambda ps: ps[1].st_mtime, reverse=True)
+    top = stats[:limit]
+
+    # The listing only changes when the set of newest files changes, so the
+    # validator is built from names + mtimes without opening any report.
+    digest = hashlib.sha1(
+        "|".join(f"{p.name}:{st.st_mtime_ns}" for p, st in top).encode("utf-8")
+    ).hexdigest()[:16]
+    etag = f'W/"{limit}-{digest}"'
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    items = []
+    for p, _ in top:
+        created_at = report_created_at(p.stem)
+        if created_at is None:
             continue
+        items.append({"incident_id": p.stem, "created_at": created_at})
+
+    return Response(orjson.dumps({"incidents": items}), media_type="application/json", headers={"ETag": etag})
+
+
+# ---------- Watch mode ----------
+def _open_watch_incident(service: str, severity: str, signals: Dict[str, Any]) -> Optional[str]:
+    """Queue a normal triage for an incident raised by the watcher; None if admission shed it."""
+    req = TriageRequest(
+        alert=AlertPayload(
+            service=service,
+            severity=severity,
+            timestamp=datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            signals=signals,
+        ),
+    )
+    try:
+        job = triage_queue.submit(_new_job(req))
+    except Rejected as e:
+        log_event("watch_incident_shed", new_trace_id(), {"service": service, "severity": severity, "status": e.status_code})
+        return None
+    return job.incident_id
+
+
+watch_scheduler = WatchScheduler(_open_watch_incident)
+
+
+@app.on_event("startup")
+def _build_similarity_index():
+    # Load/backfill before serving so the first triage does not pay for it
+    similarity_index()
+
+
+@app.on_event("startup")
+def _start_request_index():
+    # Keep the request-ID index fresh off the request path; triage only looks it up
+    if isinstance(data_source(), FileDataSource):
+        REQUEST_ID_INDEX.start()
+
+
+@app.on_event("startup")
+def _start_watch():
+    if WATCH_ENABLED:
+        watch_scheduler.start()
+
 
-    return {"incidents": items}
+@app.on_event("shutdown")
+def _stop_watch():
+    watch_scheduler.stop()
+    REQUEST_ID_INDEX.stop()
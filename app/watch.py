@@ -0,0 +1,308 @@
+from __future__ import annotations
+import heapq
+import math
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import orjson
+
+from agents.log_agent import analyze_logs
+from agents.metrics_agent import analyze_metric_columns, analyze_metrics
+from tools.logs import LIVE_LOG_DIR
+from tools.metrics import LIVE_METRICS_DIR
+from tools.metrics_columnar import COLUMNAR_SUFFIX, columnar_is_current, read_window
+from tools.observability import log_event, new_trace_id
+
+# (service, severity, signals) -> incident_id
+OpenIncident = Callable[[str, str, Dict[str, Any]], Optional[str]]
+
+
+@dataclass
+class WatchConfig:
+    tick_seconds: float = float(os.getenv("INCIDENTMIND_WATCH_TICK_S", "1.0"))
+    # Max fraction of each tick spent evaluating services (bounds CPU)
+    slice_fraction: float = float(os.getenv("INCIDENTMIND_WATCH_SLICE", "0.25"))
+    min_interval: float = 5.0
+    base_interval: float = 30.0
+    max_interval: float = 300.0
+    discover_every: float = 30.0
+    incident_cooldown: float = float(os.getenv("INCIDENTMIND_WATCH_COOLDOWN_S", "600"))
+    zscore_threshold: float = 3.0
+    log_error_ratio: float = 0.20
+    # The log detector needs this many new lines, so one ERROR in a quiet service is not a 100% ratio
+    log_ratio_min_lines: int = int(os.getenv("INCIDENTMIND_WATCH_LOG_MIN_LINES", "20"))
+    window_rows: int = 120
+    # On discovery, only this much metrics history is read (to warm the
+    # baseline; detectors skip that first evaluation); logs start at EOF
+    metrics_backfill_bytes: int = 256 * 1024
+
+
+@dataclass
+class ServiceState:
+    service: str
+    interval: float
+    log_offset: int = 0
+    metrics_offset: int = 0
+    columnar_last_ts: int = 0
+    primed: bool = False
+    events: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=120))
+    score: float = 0.0
+    last_incident_at: float = -math.inf
+    last_incident_id: Optional[str] = None
+
+
+def _read_new(path: Path, offset: int) -> Tuple[List[bytes], int]:
+    """Complete lines appended to `path` since `offset`, and the new offset."""
+    try:
+        size = path.stat().st_size
+    except FileNotFoundError:
+        return [], offset
+    if size < offset:  # truncated/rotated
+        offset = 0
+    if size == offset:
+        return [], offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunk = f.read(size - offset)
+    end = chunk.rfind(b"\n") + 1
+    return chunk[:end].splitlines(), offset + end
+
+
+class WatchScheduler:
+    """
+    Background detector over every service under data/live_metrics and
+    data/live_logs. Services sit in a heap keyed by next-due time; each
+    tick evaluates due services until its time slice is used up. Recent
+    anomaly score shortens a service's interval, and a service with no new
+    data backs off exponentially up to max_interval.
+    """
+
+    def __init__(self, open_incident: OpenIncident, config: Optional[WatchConfig] = None) -> None:
+        self.open_incident = open_incident
+        self.config = config or WatchConfig()
+        self._states: Dict[str, ServiceState] = {}
+        self._heap: List[Tuple[float, str]] = []
+        # Guards _states/_heap/_lag against /watch/status reads; never held across evaluate()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_discover = -math.inf
+        self._lag: Deque[float] = deque(maxlen=1000)
+        self._last_tick_busy = 0.0
+        self._evaluations = 0
+        self._incidents_opened = 0
+
+    # ---------- lifecycle
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="incidentmind-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        cfg = self.config
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.tick(started)
+            except Exception as e:  # never let the watcher thread die
+                log_event("watch_tick_failed", "watch", {"error": repr(e)})
+            self._stop.wait(max(0.0, cfg.tick_seconds - (time.monotonic() - started)))
+
+    # ---------- scheduling
+    def discover(self, now: float) -> None:
+        services = set()
+        if LIVE_METRICS_DIR.exists():
+            services.update(p.stem for p in LIVE_METRICS_DIR.glob("*.jsonl"))
+            services.update(p.name[: -len(COLUMNAR_SUFFIX)] for p in LIVE_METRICS_DIR.glob(f"*{COLUMNAR_SUFFIX}"))
+        if LIVE_LOG_DIR.exists():
+            services.update(p.stem for p in LIVE_LOG_DIR.glob("*.log"))
+
+        with self._lock:
+            new = services - self._states.keys()
+        for service in new:
+            state = ServiceState(
+                service,
+                interval=self.config.base_interval,
+                log_offset=_size(LIVE_LOG_DIR / f"{service}.log"),
+                metrics_offset=max(0, _size(LIVE_METRICS_DIR / f"{service}.jsonl") - self.config.metrics_backfill_bytes),
+                events=deque(maxlen=self.config.window_rows),
+            )
+            with self._lock:
+                self._states[service] = state
+                heapq.heappush(self._heap, (now, service))
+        self._last_discover = now
+
+    def tick(self, now: Optional[float] = None) -> int:
+        """Evaluate due services within this tick's time slice; returns services evaluated."""
+        cfg = self.config
+        now = time.monotonic() if now is None else now
+        if now - self._last_discover >= cfg.discover_every:
+            self.discover(now)
+
+        budget = cfg.tick_seconds * cfg.slice_fraction
+        t0 = time.perf_counter()
+        done = 0
+        while time.perf_counter() - t0 < budget:
+            with self._lock:
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                due, service = heapq.heappop(self._heap)
+                self._lag.append(max(0.0, now - due))
+                state = self._states[service]
+            try:
+                has_new = self.evaluate(state, now)
+            except Exception as e:
+                log_event("watch_evaluate_failed", "watch", {"service": service, "error": repr(e)})
+                has_new = False
+            state.interval = self._next_interval(state, has_new)
+            with self._lock:
+                heapq.heappush(self._heap, (now + state.interval, service))
+            done += 1
+
+        self._last_tick_busy = time.perf_counter() - t0
+        self._evaluations += done
+        return done
+
+    def _next_interval(self, state: ServiceState, has_new: bool) -> float:
+        cfg = self.config
+        if not has_new:
+            return min(cfg.max_interval, state.interval * 2)
+        return max(cfg.min_interval, min(cfg.max_interval, cfg.base_interval / (1.0 + state.score)))
+
+    # ---------- detection
+    def evaluate(self, state: ServiceState, now: float) -> bool:
+        """Pull new data for one service, rescore it, open an incident if detectors fire."""
+        cfg = self.config
+        service = state.service
+
+        new_lines, state.log_offset = _read_new(LIVE_LOG_DIR / f"{service}.log", state.log_offset)
+        first = not state.primed
+        state.primed = True
+
+        if columnar_is_current(service):
+            window = read_window(service, limit=cfg.window_rows)
+            ts = window.get("ts")
+            last_ts = ts[-1] if ts else 0
+            new_rows = last_ts != state.columnar_last_ts
+            state.columnar_last_ts = last_ts
+            metric_findings = analyze_metric_columns(window) if new_rows else None
+            series = list(window.get("error_rate", ()))
+        else:
+            start = state.metrics_offset
+            new_events, state.metrics_offset = _read_new(LIVE_METRICS_DIR / f"{service}.jsonl", start)
+            if first and start > 0 and new_events:
+                new_events = new_events[1:]  # backfill began mid-line
+            for raw in new_events:
+                try:
+                    state.events.append(orjson.loads(raw))
+                except orjson.JSONDecodeError:
+                    continue
+            new_rows = bool(new_events)
+            metric_findings = analyze_metrics(list(state.events)) if new_rows else None
+            series = [
+                float(v) for v in (ev.get("metrics", {}).get("error_rate") for ev in state.events)
+                if isinstance(v, (int, float))
+            ]
+
+        if not new_lines and not new_rows:
+            return False
+        if first:
+            # Backfilled history only warms the baseline; it is not new evidence
+            return True
+
+        anomalies = (metric_findings or {}).get("anomalies", [])
+        z = _zscore([v for v in series if v == v])
+        error_ratio = 0.0
+        enough_lines = len(new_lines) >= cfg.log_ratio_min_lines
+        if enough_lines:
+            log_findings = analyze_logs([line.decode("utf-8", errors="replace") for line in new_lines], top_n=50)
+            error_ratio = sum(e["count"] for e in log_findings["top_errors"]) / len(new_lines)
+        state.score = 0.5 * state.score + len(anomalies) + max(0.0, z - 2.0) + 5.0 * error_ratio
+
+        fired = []
+        if anomalies:
+            fired.append("threshold")
+        if z >= cfg.zscore_threshold:
+            fired.append("error_rate_zscore")
+        if enough_lines and error_ratio >= cfg.log_error_ratio:
+            fired.append("log_error_ratio")
+
+        if fired and now - state.last_incident_at >= cfg.incident_cooldown:
+            self._open(state, now, fired, anomalies, error_ratio)
+        return True
+
+    def _open(self, state: ServiceState, now: float, fired: List[str], anomalies: List[Dict[str, Any]], error_ratio: float) -> None:
+        signals: Dict[str, Any] = {a["metric"]: a["last_value"] for a in anomalies}
+        if error_ratio and "error_rate" not in signals:
+            signals["log_error_ratio"] = round(error_ratio, 4)
+        severity = "critical" if len(fired) >= 2 or len(anomalies) >= 2 else "warning"
+
+        incident_id = self.open_incident(state.service, severity, signals)
+        if incident_id is None:
+            return  # shed by admission control; detectors retry on the next evaluation
+        # Cooldown starts only once the triage was actually queued
+        state.last_incident_at = now
+        state.last_incident_id = incident_id
+        self._incidents_opened += 1
+        log_event(
+            "watch_incident_opened",
+            new_trace_id(),
+            {"service": state.service, "incident_id": state.last_incident_id, "detectors": fired, "score": round(state.score, 3)},
+        )
+
+    # ---------- introspection
+    def status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            lag = sorted(self._lag)
+            states = list(self._states.values())
+            overdue = sum(1 for due, _ in self._heap if due <= now)
+        top = sorted(states, key=lambda s: s.score, reverse=True)[:10]
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "services": len(states),
+            "overdue": overdue,
+            "evaluations": self._evaluations,
+            "incidents_opened": self._incidents_opened,
+            "last_tick_busy_s": round(self._last_tick_busy, 4),
+            "lag_s": {
+                "p50": round(lag[len(lag) // 2], 3) if lag else 0.0,
+                "p99": round(lag[min(len(lag) - 1, int(len(lag) * 0.99))], 3) if lag else 0.0,
+                "max": round(lag[-1], 3) if lag else 0.0,
+            },
+            "top_services": [
+                {"service": s.service, "score": round(s.score, 3), "interval_s": s.interval, "last_incident_id": s.last_incident_id}
+                for s in top
+            ],
+        }
+
+
+def _zscore(values: List[float]) -> float:
+    """How far the latest value sits above the preceding window."""
+    if len(values) < 10:
+        return 0.0
+    base = values[:-1]
+    std = statistics.pstdev(base)
+    if std == 0:
+        return 0.0
+    return (values[-1] - statistics.fmean(base)) / std
+
+
+def _size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
@@ -0,0 +1,50 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from agents.metrics_agent import DEFAULT_THRESHOLDS
+from tools.logs import LIVE_LOG_DIR
+from tools.metrics import LIVE_METRICS_DIR
+from tools.replay import load_incidents, plan_shards, run_backtest
+
+def main():
+    # Example:
+    #   python scripts/backtest.py --incidents data/known_incidents.jsonl \
+    #       --threshold error_rate=0.15 --threshold latency_p95_ms=700 --workers 8
+    ap = argparse.ArgumentParser(description="Replay recorded logs/metrics through the agents and score rules.")
+    ap.add_argument("--logs-dir", type=Path, default=LIVE_LOG_DIR)
+    ap.add_argument("--metrics-dir", type=Path, default=LIVE_METRICS_DIR)
+    ap.add_argument("--incidents", type=Path, help="JSONL of known incidents: service, start, end[, label]")
+    ap.add_argument("--service", action="append", dest="services", help="limit to these services (repeatable)")
+    ap.add_argument("--step", type=int, default=60, help="simulated seconds between evaluations")
+    ap.add_argument("--window", type=int, default=30, help="triage window in minutes")
+    ap.add_argument("--shard-hours", type=float, default=6.0)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--threshold", action="append", default=[], metavar="METRIC=VALUE")
+    args = ap.parse_args()
+
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    for item in args.threshold:
+        k, _, v = item.partition("=")
+        if k not in thresholds:
+            ap.error(f"unknown metric in --threshold: {k}")
+        thresholds[k] = float(v)
+
+    shards = plan_shards(
+        logs_dir=args.logs_dir,
+        metrics_dir=args.metrics_dir,
+        incidents=load_incidents(args.incidents) if args.incidents else [],
+        services=args.services,
+        step_s=args.step,
+        window_s=args.window * 60,
+        shard_s=int(args.shard_hours * 3600),
+        thresholds=thresholds,
+    )
+    result = run_backtest(shards, workers=args.workers)
+    result["thresholds"] = thresholds
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
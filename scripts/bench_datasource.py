@@ -0,0 +1,43 @@
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from tools.datasources import HttpDataSource
+
+def main():
+    # Usage: python scripts/bench_datasource.py [base_url] [concurrency] [services...]
+    # Start scripts/datasource_server.py first. Simulates `concurrency` triages
+    # hitting the backend at once and reports how many calls actually went out.
+    base_url = sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:8900"
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    services = sys.argv[3:] or ["orders-api"]
+
+    source = HttpDataSource(base_url)
+
+    def triage_fetch(i):
+        service = services[i % len(services)]
+        t0 = time.perf_counter()
+        source.fetch_logs(service)
+        source.fetch_metrics(service)
+        return time.perf_counter() - t0
+
+    for label in ("cold", "warm"):
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = sorted(pool.map(triage_fetch, range(concurrency)))
+        wall = time.perf_counter() - t0
+        print(json.dumps({
+            "run": label,
+            "triages": concurrency,
+            "wall_s": round(wall, 4),
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2),
+            **source.stats(),
+        }))
+    source.close()
+
+if __name__ == "__main__":
+    main()
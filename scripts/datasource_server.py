@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from tools.log_index import REQUEST_ID_INDEX, correlate_requests
+from tools.logs import fetch_logs
+from tools.metrics import fetch_metrics
+
+# Local stand-in for a remote logs/metrics backend, serving the existing data/ files.
+#   GET /logs?services=a,b&limit=500     -> {"a": [...lines], "b": [...]}
+#   GET /metrics?services=a,b&limit=120  -> {"a": [...events], "b": [...]}
+#   GET /correlate?service=a&request_ids=r1,r2&max_lines=20 -> correlate_requests() result
+# INCIDENTMIND_STANDIN_LATENCY_MS adds a fixed delay per request, to mimic a remote backend.
+PORT = int(os.getenv("INCIDENTMIND_STANDIN_PORT", "8900"))
+LATENCY_S = float(os.getenv("INCIDENTMIND_STANDIN_LATENCY_MS", "0")) / 1000.0
+
+FETCHERS = {"/logs": (fetch_logs, 500), "/metrics": (fetch_metrics, 120)}
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so client pools are exercised
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            return self._send(200, {"status": "ok"})
+        if url.path == "/correlate":
+            qs = parse_qs(url.query)
+            request_ids = [r for r in ",".join(qs.get("request_ids", [])).split(",") if r]
+            max_lines = int(qs.get("max_lines", ["20"])[0])
+            if LATENCY_S:
+                time.sleep(LATENCY_S)
+            return self._send(200, correlate_requests(request_ids, qs.get("service", [""])[0], max_lines=max_lines))
+        if url.path not in FETCHERS:
+            return self._send(404, {"error": "not found"})
+
+        fetch, default_limit = FETCHERS[url.path]
+        qs = parse_qs(url.query)
+        services = [s for s in ",".join(qs.get("services", [])).split(",") if s]
+        limit = int(qs.get("limit", [default_limit])[0])
+        if LATENCY_S:
+            time.sleep(LATENCY_S)
+        self._send(200, {s: fetch(s, limit=limit) for s in services})
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        pass
+
+def main():
+    REQUEST_ID_INDEX.start()
+    server = ThreadingHTTPServer(("127.0.0.1", PORT), Handler)
+    print(f"Serving data/ as a logs/metrics backend on http://127.0.0.1:{PORT}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
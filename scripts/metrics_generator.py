@@ -1,20 +1,38 @@
 import json
+import os
+import sys
 import time
 import random
 from datetime import datetime, timezone
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from tools.metrics_columnar import append_row, columnar_dir
+
 OUT_PATH = Path(__file__).resolve().parents[1] / "data" / "live_metrics" / "orders-api.jsonl"
 OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
 
+# jsonl | columnar | both
+OUT_FORMAT = os.getenv("INCIDENTMIND_METRICS_FORMAT", "jsonl")
+
 def now_iso():
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 def clamp(x, lo, hi):
     return max(lo, min(hi, x))
 
+def emit(row):
+    if OUT_FORMAT in ("jsonl", "both"):
+        with open(OUT_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(row) + "\n")
+    if OUT_FORMAT in ("columnar", "both"):
+        append_row(row["service"], row)
+
 def main():
-    print(f"Writing live metrics to: {OUT_PATH}")
+    if OUT_FORMAT in ("jsonl", "both"):
+        print(f"Writing live metrics to: {OUT_PATH}")
+    if OUT_FORMAT in ("columnar", "both"):
+        print(f"Writing columnar metrics to: {columnar_dir('orders-api')}")
 
     # Baselines
     cpu = 35.0
@@ -64,8 +82,7 @@ def main():
                         "queue_depth": round(queue_depth, 2),
                     }
                 }
-                with open(OUT_PATH, "a", encoding="utf-8") as f:
-                    f.write(json.dumps(row) + "\n")
+                emit(row)
                 time.sleep(1)
 
         # Slowly decay error rate back toward baseline
@@ -83,8 +100,7 @@ def main():
                 "queue_depth": round(queue_depth, 2),
             }
         }
-        with open(OUT_PATH, "a", encoding="utf-8") as f:
-            f.write(json.dumps(row) + "\n")
+        emit(row)
 
         time.sleep(1)
 
@@ -0,0 +1,24 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from tools.metrics import LIVE_METRICS_DIR
+from tools.metrics_columnar import columnar_dir, convert_jsonl, has_columnar
+
+def main():
+    # Usage: python scripts/metrics_to_columnar.py [service ...]
+    # With no args, converts every data/live_metrics/*.jsonl.
+    services = sys.argv[1:] or sorted(p.stem for p in LIVE_METRICS_DIR.glob("*.jsonl"))
+    for service in services:
+        if has_columnar(service):
+            print(f"Skipping {service}: {columnar_dir(service)} already exists")
+            continue
+        n = convert_jsonl(service)
+        print(f"Converted {n} rows for {service} -> {columnar_dir(service)}")
+    if os.getenv("INCIDENTMIND_METRICS_FORMAT", "jsonl") not in ("columnar", "both"):
+        print("Note: the generator is writing JSONL only; the API ignores a columnar store "
+              "older than its JSONL file. Run it with INCIDENTMIND_METRICS_FORMAT=both.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+from __future__ import annotations
+import asyncio
+import os
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from tools.log_index import correlate_requests
+from tools.logs import fetch_logs
+from tools.metrics import fetch_metrics
+
+LOGS = "logs"
+METRICS = "metrics"
+
+
+class SourceUnavailable(Exception):
+    """A backend call failed, timed out, or was refused by an open circuit breaker."""
+
+
+class DataSource(ABC):
+    """
+    Adapter interface for where logs and metrics come from. Implementations
+    return the same shapes as tools.logs.fetch_logs, tools.metrics.fetch_metrics
+    and tools.log_index.correlate_requests.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def fetch_logs(self, service: str, limit: int = 500) -> List[str]:
+        ...
+
+    @abstractmethod
+    def fetch_metrics(self, service: str, limit: int = 120) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def correlate_requests(self, request_ids: List[str], service: str, max_lines: int = 20) -> Dict[str, Any]:
+        """Follow request IDs from `service` into every other service's logs."""
+
+    def stats(self) -> Dict[str, Any]:
+        return {"source": self.name}
+
+
+class FileDataSource(DataSource):
+    """V1 behaviour: read data/live_logs and data/live_metrics directly."""
+
+    name = "file"
+
+    def fetch_logs(self, service: str, limit: int = 500) -> List[str]:
+        return fetch_logs(service, limit=limit)
+
+    def fetch_metrics(self, service: str, limit: int = 120) -> List[Dict[str, Any]]:
+        return fetch_metrics(service, limit=limit)
+
+    def correlate_requests(self, request_ids: List[str], service: str, max_lines: int = 20) -> Dict[str, Any]:
+        return correlate_requests(request_ids, service, max_lines=max_lines)
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failures` consecutive errors; open rejects calls
+    for `reset_s`, then half-open lets one trial call decide.
+    """
+
+    def __init__(self, failures: int = 5, reset_s: float = 30.0) -> None:
+        self.failures = failures
+        self.reset_s = reset_s
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self._opened_at >= self.reset_s else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._consecutive += 1
+        self._trial_in_flight = False
+        if self._opened_at is not None or self._consecutive >= self.failures:
+            self._opened_at = time.monotonic()
+
+
+class HttpDataSource(DataSource):
+    """
+    HTTP backend adapter (CloudWatch/Datadog/ELK-style gateway, or the local
+    stand-in in scripts/datasource_server.py).
+
+    - One httpx.AsyncClient, so one keep-alive pool, is shared by every
+      caller. It runs on a private event loop thread, so the sync
+      pipeline can use it.
+    - Single-flight: concurrent requests for the same (kind, service,
+      limit) share one backend call.
+    - Batching: requests that arrive within `batch_window_s` go out as
+      one GET /<kind>?services=a,b,c&limit=N.
+    - Per-kind timeouts and circuit breakers. Request-ID correlation
+      (GET /correlate) shares the logs timeout and breaker.
+    """
+
+    name = "http"
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeouts: Optional[Dict[str, float]] = None,
+        max_connections: int = 20,
+        batch_window_s: float = 0.005,
+        breaker_failures: int = 5,
+        breaker_reset_s: float = 30.0,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeouts = {LOGS: 5.0, METRICS: 5.0, **(timeouts or {})}
+        self.batch_window_s = batch_window_s
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._breakers = {kind: CircuitBreaker(breaker_failures, breaker_reset_s) for kind in (LOGS, METRICS)}
+        self._inflight: Dict[Tuple[str, str, int], "asyncio.Future[Any]"] = {}
+        self._pending: Dict[Tuple[str, int], Dict[str, "asyncio.Future[Any]"]] = {}
+        self._counters: Dict[str, int] = defaultdict(int)
+
+        self._loop = asyncio.new_event_loop()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._thread = threading.Thread(target=self._loop.run_forever, name="incidentmind-datasource", daemon=True)
+        self._thread.start()
+
+    # ---------- sync API
+    def fetch_logs(self, service: str, limit: int = 500) -> List[str]:
+        return self._call(LOGS, service, limit)
+
+    def fetch_metrics(self, service: str, limit: int = 120) -> List[Dict[str, Any]]:
+        return self._call(METRICS, service, limit)
+
+    def correlate_requests(self, request_ids: List[str], service: str, max_lines: int = 20) -> Dict[str, Any]:
+        if not request_ids:
+            return {"services": {}, "lines": []}
+        fut = asyncio.run_coroutine_threadsafe(self._correlate(list(request_ids), service, max_lines), self._loop)
+        return self._wait(fut, self.timeouts[LOGS] + 1.0, f"correlation for {service}")
+
+    def _call(self, kind: str, service: str, limit: int) -> Any:
+        fut = asyncio.run_coroutine_threadsafe(self._get(kind, service, limit), self._loop)
+        return self._wait(fut, self.timeouts[kind] + self.batch_window_s + 1.0, f"{kind} fetch for {service}")
+
+    def _wait(self, fut: Any, timeout: float, what: str) -> Any:
+        try:
+            return fut.result(timeout=timeout)
+        except SourceUnavailable:
+            raise
+        except Exception as e:
+            fut.cancel()
+            raise SourceUnavailable(f"{what} failed: {e!r}") from e
+
+    def close(self) -> None:
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "source": self.name,
+            "base_url": self.base_url,
+            **dict(self._counters),
+            "breakers": {kind: b.state for kind, b in self._breakers.items()},
+        }
+
+    # ---------- event-loop side
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, limits=self._limits)
+        return self._client
+
+    async def _correlate(self, request_ids: List[str], service: str, max_lines: int) -> Dict[str, Any]:
+        self._counters["requests"] += 1
+        breaker = self._breakers[LOGS]
+        if not breaker.allow():
+            self._counters["breaker_rejected"] += 1
+            raise SourceUnavailable(f"{LOGS} source circuit is open")
+
+        self._counters["backend_calls"] += 1
+        try:
+            r = await self._http().get(
+                "/correlate",
+                params={"service": service, "request_ids": ",".join(request_ids), "max_lines": max_lines},
+                timeout=self.timeouts[LOGS],
+            )
+            r.raise_for_status()
+            data = r.json()
+        except Exception as e:
+            breaker.record_failure()
+            self._counters["backend_errors"] += 1
+            raise SourceUnavailable(f"correlation backend error: {e!r}") from e
+        breaker.record_success()
+        return data
+
+    async def _get(self, kind: str, service: str, limit: int) -> Any:
+        self._counters["requests"] += 1
+        key = (kind, service, limit)
+        existing = self._inflight.get(key)
+        if existing is not None:
+            self._counters["coalesced"] += 1
+            return await asyncio.shield(existing)
+
+        if not self._breakers[kind].allow():
+            self._counters["breaker_rejected"] += 1
+            raise SourceUnavailable(f"{kind} source circuit is open")
+
+        fut = self._loop.create_future()
+        self._inflight[key] = fut
+        batch_key = (kind, limit)
+        if batch_key not in self._pending:
+            self._pending[batch_key] = {}
+            self._loop.call_later(self.batch_window_s, lambda: self._loop.create_task(self._flush(batch_key)))
+        self._pending[batch_key][service] = fut
+        try:
+            return await asyncio.shield(fut)
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _flush(self, batch_key: Tuple[str, int]) -> None:
+        kind, limit = batch_key
+        batch = self._pending.pop(batch_key, {})
+        if not batch:
+            return
+        self._counters["backend_calls"] += 1
+        breaker = self._breakers[kind]
+        try:
+            r = await self._http().get(
+                f"/{kind}",
+                params={"services": ",".join(batch), "limit": limit},
+                timeout=self.timeouts[kind],
+            )
+            r.raise_for_status()
+            data = r.json()
+        except Exception as e:
+            breaker.record_failure()
+            self._counters["backend_errors"] += 1
+            for fut in batch.values():
+                if not fut.done():
+                    fut.set_exception(SourceUnavailable(f"{kind} backend error: {e!r}"))
+            return
+
+        breaker.record_success()
+        for service, fut in batch.items():
+            if not fut.done():
+                fut.set_result(data.get(service, []))
+
+
+_SOURCE: Optional[DataSource] = None
+_SOURCE_LOCK = threading.Lock()
+
+
+def data_source() -> DataSource:
+    """
+    Process-wide adapter picked by INCIDENTMIND_DATASOURCE (file | http).
+    http reads INCIDENTMIND_DATASOURCE_URL, INCIDENTMIND_LOGS_TIMEOUT_S and
+    INCIDENTMIND_METRICS_TIMEOUT_S.
+    """
+    global _SOURCE
+    with _SOURCE_LOCK:
+        if _SOURCE is None:
+            kind = os.getenv("INCIDENTMIND_DATASOURCE", "file")
+            if kind == "http":
+                _SOURCE = HttpDataSource(
+                    os.getenv("INCIDENTMIND_DATASOURCE_URL", "http://127.0.0.1:8900"),
+                    timeouts={
+                        LOGS: float(os.getenv("INCIDENTMIND_LOGS_TIMEOUT_S", "5")),
+                        METRICS: float(os.getenv("INCIDENTMIND_METRICS_TIMEOUT_S", "5")),
+                    },
+                )
+            else:
+                _SOURCE = FileDataSource()
+        return _SOURCE
@@ -0,0 +1,247 @@
+from __future__ import annotations
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from tools.logs import LIVE_LOG_DIR
+from tools.observability import log_event
+
+_REQUEST_ID_RE = re.compile(rb"request_id=([A-Za-z0-9\-_]+)")
+_LEVEL_RE = re.compile(rb"level=([A-Z]+)")
+_TS_RE = re.compile(rb"^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z)")
+
+RETENTION_SECONDS = float(os.getenv("INCIDENTMIND_REQUEST_INDEX_RETENTION_S", "3600"))
+# A log seen for the first time is indexed from at most this far before its end
+BACKFILL_BYTES = int(os.getenv("INCIDENTMIND_REQUEST_INDEX_BACKFILL_BYTES", str(8 * 1024 * 1024)))
+REFRESH_SECONDS = float(os.getenv("INCIDENTMIND_REQUEST_INDEX_REFRESH_S", "1"))
+
+
+def _line_epoch(line: bytes) -> Optional[float]:
+    m = _TS_RE.match(line)
+    if m is None:
+        return None
+    try:
+        return datetime.strptime(m.group(1).decode("ascii"), "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+class LogRef(NamedTuple):
+    service: str
+    offset: int
+    level: str
+
+
+class RequestIdIndex:
+    """
+    Inverted index request_id -> [(service, byte offset, level)] over every
+    data/live_logs/<service>.log. refresh() only reads bytes appended since
+    the previous call (new files start at most `backfill_bytes` from the
+    end), and refs whose line timestamp is older than `retention_seconds`
+    are skipped or evicted, so memory is bounded by recent log volume.
+    start() keeps it fresh from a background thread so lookups never ingest.
+    """
+
+    def __init__(
+        self,
+        log_dir=LIVE_LOG_DIR,
+        retention_seconds: float = RETENTION_SECONDS,
+        backfill_bytes: int = BACKFILL_BYTES,
+    ) -> None:
+        self.log_dir = log_dir
+        self.retention_seconds = retention_seconds
+        self.backfill_bytes = backfill_bytes
+        self._refs: Dict[str, List[LogRef]] = defaultdict(list)
+        self._order: Deque[Tuple[float, str, LogRef]] = deque()
+        self._offsets: Dict[str, int] = {}
+        self._inodes: Dict[str, int] = {}
+        # _lock guards _refs/_order for lookups; _refresh_lock serializes ingestion
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    # ---------- background refresh
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def start(self, interval: float = REFRESH_SECONDS) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="incidentmind-request-index", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:  # never let the indexer thread die
+                log_event("request_index_refresh_failed", "request_index", {"error": repr(e)})
+            self._stop.wait(interval)
+
+    # ---------- ingestion
+    def refresh(self, now: Optional[float] = None) -> int:
+        """Ingest newly appended lines from every service log; returns refs added."""
+        now = time.time() if now is None else now
+        cutoff = now - self.retention_seconds
+        added = 0
+        with self._refresh_lock:
+            if self.log_dir.exists():
+                for path in self.log_dir.glob("*.log"):
+                    added += self._ingest_file(path.stem, path, now, cutoff)
+            with self._lock:
+                self._evict(cutoff)
+        return added
+
+    def _ingest_file(self, service: str, path, now: float, cutoff: float) -> int:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return 0
+        size = st.st_size
+        known = service in self._offsets
+        offset = self._offsets.get(service, 0)
+        if known and (size < offset or self._inodes.get(service) != st.st_ino):
+            # Truncated/rotated: existing offsets point into the old file
+            with self._lock:
+                self._drop_service(service)
+            known, offset = False, 0
+        self._inodes[service] = st.st_ino
+        if not known:
+            offset = max(0, size - self.backfill_bytes)
+        if size == offset:
+            self._offsets[service] = offset
+            return 0
+
+        with open(path, "rb") as f:
+            f.seek(offset)
+            chunk = f.read(size - offset)
+        pos = 0
+        if not known and offset > 0:
+            pos = chunk.find(b"\n") + 1  # backfill began mid-line
+            if pos == 0:
+                return 0
+        end = chunk.rfind(b"\n") + 1  # leave a partial trailing line for next time
+        if end <= pos:
+            self._offsets[service] = offset + pos
+            return 0
+
+        entries: List[Tuple[float, str, LogRef]] = []
+        while pos < end:
+            nl = chunk.index(b"\n", pos)
+            line = chunk[pos:nl]
+            rid = _REQUEST_ID_RE.search(line)
+            if rid:
+                ts = _line_epoch(line)
+                ts = now if ts is None else ts
+                if ts >= cutoff:
+                    lvl = _LEVEL_RE.search(line)
+                    ref = LogRef(service, offset + pos, lvl.group(1).decode("ascii") if lvl else "")
+                    entries.append((ts, rid.group(1).decode("ascii"), ref))
+            pos = nl + 1
+
+        with self._lock:
+            for ts, key, ref in entries:
+                self._refs[key].append(ref)
+                self._order.append((ts, key, ref))
+        self._offsets[service] = offset + end
+        return len(entries)
+
+    def _drop_service(self, service: str) -> None:
+        self._offsets.pop(service, None)
+        for key in list(self._refs):
+            kept = [ref for ref in self._refs[key] if ref.service != service]
+            if kept:
+                self._refs[key] = kept
+            else:
+                del self._refs[key]
+        self._order = deque(item for item in self._order if item[2].service != service)
+
+    def _evict(self, cutoff: float) -> None:
+        # _order is in ingestion order, which tracks line time closely enough
+        while self._order and self._order[0][0] < cutoff:
+            _, key, ref = self._order.popleft()
+            refs = self._refs.get(key)
+            if not refs:
+                continue
+            try:
+                refs.remove(ref)
+            except ValueError:
+                pass
+            if not refs:
+                del self._refs[key]
+
+    def lookup(self, request_ids: Iterable[str]) -> Dict[str, List[LogRef]]:
+        with self._lock:
+            return {rid: list(self._refs[rid]) for rid in request_ids if rid in self._refs}
+
+    def read_lines(self, refs: Iterable[LogRef]) -> List[Tuple[LogRef, str]]:
+        """Fetch the raw log line for each ref with one open() per service file."""
+        by_service: Dict[str, List[LogRef]] = defaultdict(list)
+        for ref in refs:
+            by_service[ref.service].append(ref)
+
+        out: List[Tuple[LogRef, str]] = []
+        for service, srefs in by_service.items():
+            path = self.log_dir / f"{service}.log"
+            try:
+                with open(path, "rb") as f:
+                    for ref in sorted(srefs, key=lambda r: r.offset):
+                        f.seek(ref.offset)
+                        out.append((ref, f.readline().rstrip(b"\n").decode("utf-8", errors="replace")))
+            except FileNotFoundError:
+                continue
+        return out
+
+
+REQUEST_ID_INDEX = RequestIdIndex()
+
+
+def correlate_requests(
+    request_ids: List[str],
+    service: str,
+    max_lines: int = 20,
+    index: Optional[RequestIdIndex] = None,
+) -> Dict[str, Any]:
+    """
+    Tool (V1): follow request IDs seen in `service`'s logs into every other
+    service's logs with one index lookup. Returns per-service level counts
+    and up to `max_lines` matching lines (ERROR lines first). Ingests inline
+    only when the index has no background refresher (scripts, one-off use).
+    """
+    if index is None:
+        index = REQUEST_ID_INDEX
+    if not index.running:
+        index.refresh()
+
+    refs = [
+        ref
+        for rid_refs in index.lookup(request_ids).values()
+        for ref in rid_refs
+        if ref.service != service
+    ]
+    services: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for ref in refs:
+        services[ref.service][ref.level or "UNKNOWN"] += 1
+
+    refs.sort(key=lambda r: r.level != "ERROR")
+    lines = [
+        {"service": ref.service, "level": ref.level, "line": line}
+        for ref, line in index.read_lines(refs[:max_lines])
+    ]
+    lines.sort(key=lambda item: item["level"] != "ERROR")
+    return {"services": {s: dict(c) for s, c in services.items()}, "lines": lines}
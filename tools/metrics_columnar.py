@@ -0,0 +1,210 @@
+from __future__ import annotations
+import bisect
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from tools.metrics import LIVE_METRICS_DIR
+
+# On-disk layout (one directory per service):
+#   data/live_metrics/<service>.cols/
+#       HEADER          magic line + one metric name per line
+#       ts.i64          int64 epoch seconds, native little-endian, append-only
+#       <metric>.f64    float64 per row (NaN = missing), append-only
+# Every column has the same row count; ts.i64 is written last so readers
+# treat its length as the committed row count, and append_rows() trims any
+# column that an interrupted append left longer than that.
+COLUMNAR_SUFFIX = ".cols"
+HEADER_FILE = "HEADER"
+HEADER_MAGIC = "incidentmind-columnar v1"
+TS_FILE = "ts.i64"
+
+if sys.byteorder != "little":
+    raise ImportError("tools.metrics_columnar requires a little-endian host")
+
+
+def columnar_dir(service: str) -> Path:
+    return LIVE_METRICS_DIR / f"{service}{COLUMNAR_SUFFIX}"
+
+
+def has_columnar(service: str) -> bool:
+    return (columnar_dir(service) / HEADER_FILE).exists()
+
+
+def columnar_is_current(service: str) -> bool:
+    """
+    True when the columnar store exists and is at least as fresh as the
+    service's JSONL file. A store converted once while the generator keeps
+    writing JSONL only is a frozen snapshot, so callers fall back to JSONL.
+    """
+    ts_path = columnar_dir(service) / TS_FILE
+    if not has_columnar(service) or not ts_path.exists():
+        return False
+    jsonl = LIVE_METRICS_DIR / f"{service}.jsonl"
+    if not jsonl.exists():
+        return True
+    return ts_path.stat().st_mtime_ns >= jsonl.stat().st_mtime_ns
+
+
+def _iso_to_epoch(ts: str) -> int:
+    return int(datetime.strptime(ts, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp())
+
+
+def epoch_to_iso(epoch: int) -> str:
+    return datetime.fromtimestamp(int(epoch), tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def read_header(service: str) -> List[str]:
+    path = columnar_dir(service) / HEADER_FILE
+    if not path.exists():
+        return []
+    lines = path.read_text(encoding="utf-8").splitlines()
+    if not lines or lines[0] != HEADER_MAGIC:
+        raise ValueError(f"Not a columnar metrics header: {path}")
+    return [name for name in lines[1:] if name]
+
+
+def _init_store(service: str, metric_names: Sequence[str]) -> List[str]:
+    existing = read_header(service)
+    if existing:
+        missing = [m for m in metric_names if m not in existing]
+        if missing:
+            raise ValueError(f"Columnar store for {service} has no columns for: {missing}")
+        return existing
+
+    d = columnar_dir(service)
+    d.mkdir(parents=True, exist_ok=True)
+    names = list(metric_names)
+    (d / HEADER_FILE).write_text("\n".join([HEADER_MAGIC, *names]) + "\n", encoding="utf-8")
+    for name in [TS_FILE, *(f"{m}.f64" for m in names)]:
+        (d / name).touch()
+    return names
+
+
+def _align_columns(service: str, names: Sequence[str]) -> None:
+    """
+    Trim every column to the committed row count (len(ts.i64)) so rows left
+    by an interrupted append cannot shift later rows out of line with ts.
+    """
+    d = columnar_dir(service)
+    rows = _size(d / TS_FILE) // 8
+    for name in [TS_FILE, *(f"{m}.f64" for m in names)]:
+        path = d / name
+        size = _size(path)
+        if size > rows * 8:
+            os.truncate(path, rows * 8)
+        elif size < rows * 8:
+            # Cannot happen with ts written last, but keep the columns aligned regardless
+            with open(path, "ab") as f:
+                f.write(struct.pack("<d", math.nan) * (rows - size // 8))
+
+
+def _size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def append_rows(service: str, rows: Iterable[Dict[str, Any]]) -> int:
+    """
+    Append metric events ({"ts": ISO or epoch, "metrics": {...}}) to the
+    service's columnar store, creating it from the first row's metric names.
+    Returns the number of rows written.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    names = _init_store(service, list(rows[0].get("metrics", {}).keys()))
+    _align_columns(service, names)
+    ts_col = bytearray()
+    cols: Dict[str, bytearray] = {m: bytearray() for m in names}
+    for row in rows:
+        ts = row.get("ts")
+        epoch = _iso_to_epoch(ts) if isinstance(ts, str) else int(ts)
+        ts_col += epoch.to_bytes(8, "little", signed=True)
+        m = row.get("metrics", {})
+        for name in names:
+            v = m.get(name)
+            cols[name] += struct.pack("<d", float(v) if isinstance(v, (int, float)) else math.nan)
+
+    d = columnar_dir(service)
+    for name, buf in cols.items():
+        with open(d / f"{name}.f64", "ab") as f:
+            f.write(buf)
+    with open(d / TS_FILE, "ab") as f:
+        f.write(ts_col)
+    return len(rows)
+
+
+def append_row(service: str, row: Dict[str, Any]) -> None:
+    append_rows(service, [row])
+
+
+def _map(path: Path, fmt: str) -> memoryview:
+    size = path.stat().st_size if path.exists() else 0
+    size -= size % 8
+    if size == 0:
+        return memoryview(b"").cast("B").cast(fmt)
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+    return memoryview(mm).cast(fmt)
+
+
+def read_window(
+    service: str,
+    *,
+    start_epoch: Optional[int] = None,
+    end_epoch: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> Dict[str, memoryview]:
+    """
+    Tool (V1): read a time window of metrics as zero-copy column slices.
+    Returns {"ts": int64 view, "<metric>": float64 view, ...}; the window is
+    [start_epoch, end_epoch) on ts, then trimmed to the last `limit` rows.
+    Assumes rows were appended in ts order (as the generator does).
+    """
+    names = read_header(service)
+    if not names:
+        return {}
+
+    d = columnar_dir(service)
+    ts = _map(d / TS_FILE, "q")
+    columns = {m: _map(d / f"{m}.f64", "d") for m in names}
+    n = min([len(ts), *(len(c) for c in columns.values())])
+
+    lo = bisect.bisect_left(ts, start_epoch, 0, n) if start_epoch is not None else 0
+    hi = bisect.bisect_left(ts, end_epoch, lo, n) if end_epoch is not None else n
+    if limit is not None:
+        lo = max(lo, hi - limit)
+
+    out: Dict[str, memoryview] = {"ts": ts[lo:hi]}
+    for m, col in columns.items():
+        out[m] = col[lo:hi]
+    return out
+
+
+def convert_jsonl(service: str, src: Optional[Path] = None) -> int:
+    """
+    Convert an existing data/live_metrics/<service>.jsonl into the columnar
+    store. Rows are appended, so run it once against an empty store.
+    """
+    src = src or (LIVE_METRICS_DIR / f"{service}.jsonl")
+    if not src.exists():
+        return 0
+
+    rows: List[Dict[str, Any]] = []
+    with open(src, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return append_rows(service, rows)
@@ -0,0 +1,359 @@
+from __future__ import annotations
+import bisect
+import os
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import orjson
+
+from agents.alert_agent import build_incident_context
+from agents.log_agent import analyze_logs
+from agents.metrics_agent import DEFAULT_THRESHOLDS, analyze_metrics
+from agents.rca_agent import build_rca_hypothesis
+from tools.logs import LIVE_LOG_DIR
+from tools.metrics import LIVE_METRICS_DIR
+
+METRICS_LIMIT = 120
+LOGS_LIMIT = 500
+
+_LOG_TS_RE = re.compile(r"^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z)")
+_LINE_TS_RE = re.compile(rb'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z)|"ts"\s*:\s*"([^"]+)"')
+# Root causes that mean "nothing found" rather than a positive call
+_NON_FINDINGS = {"Insufficient evidence (V1)", "Blocked by safety policy"}
+
+
+def _epoch(ts: str) -> Optional[int]:
+    try:
+        return int(datetime.strptime(ts, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class Incident:
+    """A known (labelled) incident to score against."""
+    service: str
+    start: int
+    end: int
+    label: str = ""
+
+
+def load_incidents(path: Path) -> List[Incident]:
+    """JSONL: {"service": ..., "start": ISO, "end": ISO, "label": optional}."""
+    out: List[Incident] = []
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            rec = orjson.loads(line)
+            start, end = _epoch(rec["start"]), _epoch(rec["end"])
+            if start is None or end is None:
+                continue
+            out.append(Incident(rec["service"], start, end, rec.get("label", "")))
+    return out
+
+
+@dataclass
+class Shard:
+    service: str
+    start: int
+    end: int
+    logs_path: Path
+    metrics_path: Path
+    step_s: int
+    window_s: int
+    thresholds: Dict[str, float]
+    incidents: List[Incident]
+    # Byte ranges covering [start - window_s, end) in each file, from plan_shards
+    logs_range: Tuple[int, int] = (0, -1)
+    metrics_range: Tuple[int, int] = (0, -1)
+
+
+@dataclass
+class RuleStats:
+    tp: int = 0
+    fp: int = 0
+    fn: int = 0
+    tn: int = 0
+    detected: Set[Tuple[str, int]] = field(default_factory=set)  # (service, incident start)
+
+    def merge(self, other: "RuleStats") -> None:
+        self.tp += other.tp
+        self.fp += other.fp
+        self.fn += other.fn
+        self.tn += other.tn
+        self.detected |= other.detected
+
+
+@dataclass
+class ShardResult:
+    rules: Dict[str, RuleStats]
+    steps: int
+    log_lines: int
+    metric_events: int
+    simulated_s: int
+
+
+def _line_ts(raw: bytes) -> Optional[int]:
+    m = _LINE_TS_RE.search(raw)
+    if m is None:
+        return None
+    return _epoch((m.group(1) or m.group(2)).decode("ascii", errors="replace"))
+
+
+def _boundary_offsets(path: Path, boundaries: Iterable[int]) -> Dict[int, int]:
+    """
+    One pass over a ts-ordered file: for each boundary, the byte offset of
+    the first line whose ts (running max, so stray lines cannot end a range
+    early) reaches it. Boundaries past the last line map to the file size.
+    """
+    pending = sorted(set(boundaries))
+    out: Dict[int, int] = {}
+    if not path.exists():
+        return {b: 0 for b in pending}
+    i, offset, running = 0, 0, None
+    with open(path, "rb") as f:
+        for raw in f:
+            ts = _line_ts(raw)
+            if ts is not None and (running is None or ts > running):
+                running = ts
+                while i < len(pending) and running >= pending[i]:
+                    out[pending[i]] = offset
+                    i += 1
+                if i == len(pending):
+                    break
+            offset += len(raw)
+    for b in pending[i:]:
+        out[b] = offset
+    return out
+
+
+def _read_range(path: Path, byte_range: Tuple[int, int]) -> List[bytes]:
+    start, end = byte_range
+    if not path.exists():
+        return []
+    with open(path, "rb") as f:
+        f.seek(start)
+        chunk = f.read() if end < 0 else f.read(max(0, end - start))
+    return chunk.splitlines()
+
+
+def _load_window(shard: Shard) -> Tuple[List[int], List[str], List[int], List[Dict[str, Any]]]:
+    """Lines/events with ts in [start - window, end), sorted by ts."""
+    lo, hi = shard.start - shard.window_s, shard.end
+
+    logs: List[Tuple[int, str]] = []
+    for raw in _read_range(shard.logs_path, shard.logs_range):
+        line = raw.decode("utf-8", errors="replace")
+        m = _LOG_TS_RE.match(line)
+        ts = _epoch(m.group(1)) if m else None
+        if ts is not None and lo <= ts < hi:
+            logs.append((ts, line))
+
+    events: List[Tuple[int, Dict[str, Any]]] = []
+    for raw in _read_range(shard.metrics_path, shard.metrics_range):
+        try:
+            ev = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            continue
+        ts = _epoch(ev.get("ts"))
+        if ts is not None and lo <= ts < hi:
+            events.append((ts, ev))
+
+    logs.sort(key=lambda x: x[0])
+    events.sort(key=lambda x: x[0])
+    return [t for t, _ in logs], [l for _, l in logs], [t for t, _ in events], [e for _, e in events]
+
+
+def replay_shard(shard: Shard) -> ShardResult:
+    """
+    Step through [start, end) in simulated time. At each step the agents see
+    only the trailing window of data, exactly as a live triage at that
+    moment would; every rule's verdict is scored against the labels.
+    """
+    log_ts, log_lines, ev_ts, events = _load_window(shard)
+    rules: Dict[str, RuleStats] = defaultdict(RuleStats)
+    steps = 0
+
+    t = shard.start
+    while t < shard.end:
+        steps += 1
+        l0, l1 = bisect.bisect_left(log_ts, t - shard.window_s), bisect.bisect_left(log_ts, t)
+        e0, e1 = bisect.bisect_left(ev_ts, t - shard.window_s), bisect.bisect_left(ev_ts, t)
+        # Same caps as the live path: fetch_metrics(limit=120), fetch_logs(limit=500)
+        window_events = events[max(e0, e1 - METRICS_LIMIT):e1]
+
+        metric_findings = analyze_metrics(window_events, shard.thresholds)
+        log_findings = analyze_logs(log_lines[max(l0, l1 - LOGS_LIMIT):l1])
+        signals = window_events[-1].get("metrics", {}) if window_events else {}
+        context = build_incident_context(
+            service=shard.service,
+            severity="unknown",
+            time_window_minutes=max(1, shard.window_s // 60),
+            signals=signals,
+        )
+        rca = build_rca_hypothesis(context, log_findings, metric_findings)
+
+        fired: Set[str] = {f"threshold:{a['metric']}" for a in metric_findings["anomalies"]}
+        fired |= {f"symptom:{s}" for s in context["symptoms"] if s != "no_clear_symptoms"}
+        if context["category"] != "unknown":
+            fired.add(f"category:{context['category']}")
+        if rca["root_cause"] not in _NON_FINDINGS:
+            fired.add(f"rca:{rca['root_cause']}")
+        if fired:
+            fired.add("any")
+
+        # FN/TN are derived in run_backtest from per-shard step totals
+        active = [inc for inc in shard.incidents if inc.start <= t < inc.end]
+        for rule in fired:
+            stats = rules[rule]
+            if active:
+                stats.tp += 1
+                stats.detected.update((inc.service, inc.start) for inc in active)
+            else:
+                stats.fp += 1
+        t += shard.step_s
+
+    return ShardResult(dict(rules), steps, len(log_lines), len(events), shard.end - shard.start)
+
+
+def _time_range(paths: Iterable[Path]) -> Optional[Tuple[int, int]]:
+    lo, hi = None, None
+    for path in paths:
+        if not path.exists() or path.stat().st_size == 0:
+            continue
+        with open(path, "rb") as f:
+            first = f.readline()
+            f.seek(max(0, path.stat().st_size - 64 * 1024))
+            last = f.read().splitlines()[-1]
+        for raw in (first, last):
+            text = raw.decode("utf-8", errors="replace")
+            m = _LOG_TS_RE.match(text)
+            ts = _epoch(m.group(1)) if m else None
+            if ts is None:
+                try:
+                    ts = _epoch(orjson.loads(raw).get("ts"))
+                except orjson.JSONDecodeError:
+                    ts = None
+            if ts is None:
+                continue
+            lo = ts if lo is None else min(lo, ts)
+            hi = ts if hi is None else max(hi, ts)
+    return (lo, hi + 1) if lo is not None else None
+
+
+def plan_shards(
+    *,
+    logs_dir: Path = LIVE_LOG_DIR,
+    metrics_dir: Path = LIVE_METRICS_DIR,
+    incidents: Optional[List[Incident]] = None,
+    services: Optional[List[str]] = None,
+    step_s: int = 60,
+    window_s: int = 30 * 60,
+    shard_s: int = 6 * 3600,
+    thresholds: Optional[Dict[str, float]] = None,
+) -> List[Shard]:
+    """
+    Split every service's recorded range into independent time shards. Each
+    file is scanned once here to find every shard's byte range, so a shard
+    seeks straight to its own slice instead of re-reading the whole file.
+    """
+    incidents = incidents or []
+    if services is None:
+        found = {p.stem for p in logs_dir.glob("*.log")} | {p.stem for p in metrics_dir.glob("*.jsonl")}
+        services = sorted(found)
+
+    shards: List[Shard] = []
+    for service in services:
+        logs_path, metrics_path = logs_dir / f"{service}.log", metrics_dir / f"{service}.jsonl"
+        rng = _time_range([logs_path, metrics_path])
+        if rng is None:
+            continue
+        start, end = rng
+        svc_incidents = [inc for inc in incidents if inc.service == service]
+        spans: List[Tuple[int, int]] = []
+        t = start
+        while t < end:
+            # Keep shard boundaries on the step grid so no step is evaluated twice
+            shard_end = min(end, t + max(step_s, shard_s - shard_s % step_s))
+            spans.append((t, shard_end))
+            t = shard_end
+
+        boundaries = [b for t0, t1 in spans for b in (t0 - window_s, t1)]
+        log_offsets = _boundary_offsets(logs_path, boundaries)
+        metric_offsets = _boundary_offsets(metrics_path, boundaries)
+        for t0, t1 in spans:
+            shards.append(Shard(
+                service, t0, t1, logs_path, metrics_path, step_s, window_s,
+                dict(thresholds or DEFAULT_THRESHOLDS), svc_incidents,
+                logs_range=(log_offsets[t0 - window_s], log_offsets[t1]),
+                metrics_range=(metric_offsets[t0 - window_s], metric_offsets[t1]),
+            ))
+    return shards
+
+
+def run_backtest(shards: List[Shard], workers: Optional[int] = None) -> Dict[str, Any]:
+    """Replay shards across processes and return per-rule precision/recall + throughput."""
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(shards) <= 1:
+        results = [replay_shard(s) for s in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(replay_shard, shards, chunksize=max(1, len(shards) // (workers * 4))))
+    wall = time.perf_counter() - started
+
+    positives = negatives = 0
+    for shard, res in zip(shards, results):
+        pos = sum(
+            1 for t in range(shard.start, shard.end, shard.step_s)
+            if any(inc.start <= t < inc.end for inc in shard.incidents)
+        )
+        positives += pos
+        negatives += res.steps - pos
+
+    merged: Dict[str, RuleStats] = defaultdict(RuleStats)
+    for res in results:
+        for rule, stats in res.rules.items():
+            merged[rule].merge(stats)
+    for stats in merged.values():
+        # Anything not counted as TP/FP in a shard was a miss or a correct reject
+        stats.fn = positives - stats.tp
+        stats.tn = negatives - stats.fp
+
+    all_incidents = {(inc.service, inc.start) for s in shards for inc in s.incidents}
+    rules_out = {}
+    for rule in sorted(merged):
+        st = merged[rule]
+        rules_out[rule] = {
+            "tp": st.tp,
+            "fp": st.fp,
+            "fn": st.fn,
+            "tn": st.tn,
+            "precision": round(st.tp / (st.tp + st.fp), 4) if st.tp + st.fp else None,
+            "recall": round(st.tp / (st.tp + st.fn), 4) if st.tp + st.fn else None,
+            "incident_recall": round(len(st.detected) / len(all_incidents), 4) if all_incidents else None,
+        }
+
+    simulated = sum(r.simulated_s for r in results)
+    return {
+        "rules": rules_out,
+        "throughput": {
+            "shards": len(shards),
+            "workers": workers,
+            "steps": sum(r.steps for r in results),
+            "log_lines": sum(r.log_lines for r in results),
+            "metric_events": sum(r.metric_events for r in results),
+            "wall_s": round(wall, 3),
+            "steps_per_s": round(sum(r.steps for r in results) / wall, 1) if wall else None,
+            "simulated_s": simulated,
+            "speedup_x": round(simulated / wall, 1) if wall else None,
+        },
+        "labels": {"incidents": len(all_incidents), "positive_steps": positives, "negative_steps": negatives},
+    }
@@ -0,0 +1,81 @@
+from __future__ import annotations
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+# Bodies smaller than this are not worth a gzip round-trip.
+GZIP_MIN_BYTES = 1024
+
+
+@dataclass(frozen=True)
+class CachedReport:
+    body: bytes
+    etag: str
+    gzipped: Optional[bytes] = None  # None when the body is below GZIP_MIN_BYTES
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzipped or b"")
+
+
+def stat_etag(name: str, st: os.stat_result) -> str:
+    """
+    Validator from the stored file's name, size and mtime. Reports are written
+    once, so this pins the content and a 304 never needs to read the body.
+    """
+    return f'"{hashlib.sha1(f"{name}:{st.st_size}:{st.st_mtime_ns}".encode("utf-8")).hexdigest()[:20]}"'
+
+
+def gzip_etag(etag: str) -> str:
+    """ETag of the gzip-encoded representation: the identity ETag with a -gz suffix."""
+    return f'{etag[:-1]}-gz"'
+
+
+def make_entry(body: bytes, etag: str) -> CachedReport:
+    """Gzip a serialized report once, up front, if it is large enough."""
+    gz = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+    return CachedReport(body=body, etag=etag, gzipped=gz)
+
+
+class ReportCache:
+    """
+    LRU of serialized reports, bounded by total bytes rather than entry count.
+    Reports are immutable once written, so entries never need invalidating.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedReport]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedReport]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: CachedReport) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            if entry.size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += entry.size
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
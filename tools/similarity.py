@@ -0,0 +1,199 @@
+from __future__ import annotations
+import hashlib
+import re
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import orjson
+
+# MinHash signature length and LSH banding (NUM_BANDS * ROWS_PER_BAND == NUM_PERM).
+# 16 bands of 4 rows make a pair with Jaccard ~0.5 a candidate with ~65%
+# probability and one with ~0.8 with ~99.9%.
+NUM_PERM = 64
+NUM_BANDS = 16
+ROWS_PER_BAND = NUM_PERM // NUM_BANDS
+
+# Incidents with identical signatures share one index entry; a query result
+# lists at most this many of the group's (most recent) member ids.
+MAX_GROUP_MEMBERS = 10
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _perm_params() -> List[Tuple[int, int]]:
+    # Deterministic so signatures stay comparable across processes/restarts
+    out = []
+    for i in range(NUM_PERM):
+        h = hashlib.blake2b(f"incidentmind-minhash-{i}".encode("utf-8"), digest_size=16).digest()
+        a = int.from_bytes(h[:8], "little") % _MERSENNE_PRIME or 1
+        b = int.from_bytes(h[8:], "little") % _MERSENNE_PRIME
+        out.append((a, b))
+    return out
+
+
+_PERMS = _perm_params()
+_NUM_RE = re.compile(r"\d+")
+
+
+def _norm(text: Any) -> str:
+    # Collapse ids/durations so "duration_ms=1540" and "duration_ms=1622" match
+    return _NUM_RE.sub("#", str(text).strip().lower())
+
+
+def report_features(report: Dict[str, Any], include_root_cause: bool = True) -> Set[str]:
+    """Token set describing an incident (category, symptoms, errors, anomalies, root cause)."""
+    ctx = report.get("incident_context") or {}
+    logs = report.get("log_findings") or {}
+    metrics = report.get("metric_findings") or {}
+    rca = report.get("rca_hypothesis") or {}
+
+    tokens: Set[str] = set()
+    if ctx.get("category"):
+        tokens.add(f"cat:{ctx['category']}")
+    for s in ctx.get("symptoms") or []:
+        if s != "no_clear_symptoms":
+            tokens.add(f"sym:{s}")
+    for e in logs.get("top_errors") or []:
+        if e.get("pattern"):
+            tokens.add(f"err:{_norm(e['pattern'])}")
+    for a in metrics.get("anomalies") or []:
+        if a.get("metric"):
+            tokens.add(f"anom:{a['metric']}")
+    if include_root_cause and rca.get("root_cause"):
+        tokens.add(f"rc:{_norm(rca['root_cause'])}")
+    return tokens
+
+
+def minhash(tokens: Iterable[str]) -> List[int]:
+    hashes = [
+        int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=4).digest(), "little")
+        for t in tokens
+    ]
+    if not hashes:
+        return []
+    return [min(((a * x + b) % _MERSENNE_PRIME) & _MAX_HASH for x in hashes) for a, b in _PERMS]
+
+
+def _bands(sig: Sequence[int]) -> List[Tuple[int, Tuple[int, ...]]]:
+    return [(i, tuple(sig[i * ROWS_PER_BAND:(i + 1) * ROWS_PER_BAND])) for i in range(NUM_BANDS)]
+
+
+class SimilarityIndex:
+    """
+    MinHash/LSH index over incident feature sets. Queries only score
+    incidents that share at least one LSH band with the probe, so lookup
+    cost tracks the number of near matches rather than total reports.
+    Identical signatures (e.g. the same alert firing repeatedly) collapse
+    into one entry with a member list, so repeats do not grow query cost.
+    Persisted as an append-only JSONL of signatures next to the reports.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._sigs: Dict[str, Tuple[int, ...]] = {}
+        self._meta: Dict[str, Dict[str, Any]] = {}
+        self._groups: Dict[Tuple[int, ...], List[str]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[Tuple[int, ...]]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def __len__(self) -> int:
+        return len(self._sigs)
+
+    def load(self) -> bool:
+        """Load persisted signatures once. Returns False if there was no index file."""
+        with self._lock:
+            if self._loaded:
+                return True
+            self._loaded = True
+            if not self.path.exists():
+                return False
+            with open(self.path, "rb") as f:
+                for line in f:
+                    try:
+                        rec = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        continue
+                    self._insert(rec["incident_id"], rec["sig"], rec.get("meta") or {})
+            return True
+
+    def _insert(self, incident_id: str, sig: List[int], meta: Dict[str, Any]) -> None:
+        if incident_id in self._sigs:
+            return
+        key = tuple(sig)
+        self._sigs[incident_id] = key
+        self._meta[incident_id] = meta
+        members = self._groups.get(key)
+        if members is not None:
+            members.append(incident_id)
+            return
+        self._groups[key] = [incident_id]
+        for band in _bands(key):
+            self._buckets[band].append(key)
+
+    def add(self, incident_id: str, report: Dict[str, Any], persist: bool = True) -> None:
+        sig = minhash(report_features(report))
+        if not sig:
+            return
+        meta = {
+            "service": (report.get("incident_context") or {}).get("service"),
+            "root_cause": (report.get("rca_hypothesis") or {}).get("root_cause"),
+        }
+        with self._lock:
+            if incident_id in self._sigs:
+                return
+            self._insert(incident_id, sig, meta)
+            if persist:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "ab") as f:
+                    f.write(orjson.dumps({"incident_id": incident_id, "sig": sig, "meta": meta}) + b"\n")
+
+    def signature(self, incident_id: str) -> Optional[List[int]]:
+        sig = self._sigs.get(incident_id)
+        return list(sig) if sig is not None else None
+
+    def query(
+        self,
+        sig: List[int],
+        k: int = 5,
+        exclude: Optional[str] = None,
+        min_score: float = 0.0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Top-k incidents by estimated Jaccard similarity to `sig`. Each result
+        stands for a group of identical signatures: `incident_id` is its most
+        recent member, `count` the group size, `members` the latest ids.
+        """
+        if not sig:
+            return []
+        with self._lock:
+            candidates: Set[Tuple[int, ...]] = set()
+            for band in _bands(sig):
+                candidates.update(self._buckets.get(band, ()))
+            excluded_key = self._sigs.get(exclude) if exclude else None
+
+            scored = []
+            for key in candidates:
+                count = len(self._groups[key]) - (1 if key == excluded_key else 0)
+                if count == 0:
+                    continue
+                score = sum(1 for x, y in zip(sig, key) if x == y) / NUM_PERM
+                if score >= min_score:
+                    scored.append((score, count, key))
+            scored.sort(key=lambda sc: (-sc[0], self._groups[sc[2]][-1]))
+
+            out = []
+            for score, count, key in scored[:k]:
+                group = self._groups[key]
+                recent = [m for m in group[-(MAX_GROUP_MEMBERS + 1):] if m != exclude][::-1][:MAX_GROUP_MEMBERS]
+                out.append({
+                    "incident_id": recent[0],
+                    "score": round(score, 3),
+                    "count": count,
+                    "members": recent,
+                    **self._meta.get(recent[0], {}),
+                })
+            return out
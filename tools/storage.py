@@ -1,13 +1,24 @@
 from __future__ import annotations
-import json
+import threading
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, Optional
 import os
 
+import orjson
+
+from tools.report_cache import CachedReport, ReportCache, make_entry, stat_etag
+from tools.similarity import SimilarityIndex
+
 REPORT_DIR = Path(os.getenv("INCIDENTMIND_REPORT_DIR", (Path(__file__).resolve().parents[1] / "outputs" / "incident_reports").as_posix()))
 
+SIMILARITY_INDEX = SimilarityIndex(REPORT_DIR / "similarity_index.jsonl")
+_SIMILARITY_INIT_LOCK = threading.Lock()
+REPORT_CACHE = ReportCache(int(os.getenv("INCIDENTMIND_REPORT_CACHE_BYTES", str(64 * 1024 * 1024))))
+# incident_id -> created_at, so listings never touch REPORT_CACHE or re-read reports
+_CREATED_AT: Dict[str, str] = {}
+
 
 try:
     REPORT_DIR.mkdir(parents=True, exist_ok=True)
@@ -21,18 +32,94 @@ def _now_iso() -> str:
 def new_incident_id() -> str:
     return f"inc_{uuid.uuid4().hex[:8]}"
 
-def save_report(incident_id: str, report: Dict[str, Any]) -> Dict[str, Any]:
+def save_report(incident_id: str, report: Dict[str, Any]) -> CachedReport:
+    """
+    Serialize the storage envelope exactly once; the same bytes are written
+    to disk, cached, and returned for the API to send as-is.
+    """
     payload = {
         "incident_id": incident_id,
         "created_at": _now_iso(),
         "report": report,
     }
+    _CREATED_AT[incident_id] = payload["created_at"]
     path = REPORT_DIR / f"{incident_id}.json"
-    path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
-    return payload
+    body = orjson.dumps(payload)
+    # Reports are served as immutable, so readers must never see a partial file
+    tmp = REPORT_DIR / f".{incident_id}.json.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        tmp.write_bytes(body)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    entry = make_entry(body, stat_etag(path.name, path.stat()))
+    REPORT_CACHE.put(incident_id, entry)
+    # Blocked reports carry no findings, so they would only match each other
+    if not (report.get("safety") or {}).get("blocked"):
+        similarity_index().add(incident_id, report)
+    return entry
 
-def load_report(incident_id: str) -> Optional[Dict[str, Any]]:
+def similarity_index() -> SimilarityIndex:
+    """
+    The loaded similarity index; backfilled from stored reports the first
+    time. The API builds it at startup; the lock keeps concurrent first
+    callers from each running the backfill.
+    """
+    with _SIMILARITY_INIT_LOCK:
+        if not SIMILARITY_INDEX.load():
+            for path in sorted(REPORT_DIR.glob("inc_*.json"), key=lambda p: p.stat().st_mtime):
+                try:
+                    payload = orjson.loads(path.read_bytes())
+                except (OSError, orjson.JSONDecodeError):
+                    continue
+                report = payload.get("report") or {}
+                if not (report.get("safety") or {}).get("blocked"):
+                    SIMILARITY_INDEX.add(path.stem, report)
+    return SIMILARITY_INDEX
+
+def load_report_entry(incident_id: str) -> Optional[CachedReport]:
+    """Serialized report bytes + ETag, served from REPORT_CACHE when possible."""
+    entry = REPORT_CACHE.get(incident_id)
+    if entry is not None:
+        return entry
     path = REPORT_DIR / f"{incident_id}.json"
-    if not path.exists():
+    try:
+        with open(path, "rb") as f:
+            etag = stat_etag(path.name, os.fstat(f.fileno()))
+            body = f.read()
+    except FileNotFoundError:
+        return None
+    entry = make_entry(body, etag)
+    REPORT_CACHE.put(incident_id, entry)
+    return entry
+
+def report_etag(incident_id: str) -> Optional[str]:
+    """ETag for a stored report from the cache or a stat(); never reads the body."""
+    entry = REPORT_CACHE.get(incident_id)
+    if entry is not None:
+        return entry.etag
+    path = REPORT_DIR / f"{incident_id}.json"
+    try:
+        return stat_etag(path.name, path.stat())
+    except FileNotFoundError:
+        return None
+
+def report_created_at(incident_id: str) -> Optional[str]:
+    """created_at for a stored report without going through REPORT_CACHE."""
+    created_at = _CREATED_AT.get(incident_id)
+    if created_at is not None:
+        return created_at
+    try:
+        payload = orjson.loads((REPORT_DIR / f"{incident_id}.json").read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    created_at = payload.get("created_at")
+    if created_at is not None:
+        _CREATED_AT[incident_id] = created_at
+    return created_at
+
+def load_report(incident_id: str) -> Optional[Dict[str, Any]]:
+    entry = load_report_entry(incident_id)
+    if entry is None:
         return None
-    return json.loads(path.read_text(encoding="utf-8"))
+    return orjson.loads(entry.body)